@@ -0,0 +1,104 @@
+# Microbenchmark for the recording buffer in whisperer.py.
+# Simulates the sounddevice callback for a 10-minute dictation (10 ms blocks) and compares
+# the old list-of-copies approach (plus np.concatenate on release) with CaptureBuffer in
+# float32 and int16. It reports the time spent per callback and the peak memory of the
+# whole recording, including the release step. Every variant runs in its own process so
+# the peak RSS numbers don't influence each other.
+#
+# Run it from the project root:
+#   python test-script/bench-capture.py
+
+import ast, json, os, subprocess, sys, time, tracemalloc
+import numpy as np
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "whisperer.py")
+MINUTES = 10
+BLOCK = 160  # 10 ms at 16 kHz
+VARIANTS = ["list", "buffer-float32", "buffer-int16"]
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; fall back to tracemalloc there
+    resource = None
+
+def load_capture_buffer():
+    """Take CaptureBuffer straight from whisperer.py, so the benchmark always measures the real class."""
+    with open(SCRIPT, encoding="utf-8") as file:
+        tree = ast.parse(file.read())
+    node = next(n for n in tree.body if isinstance(n, ast.ClassDef) and n.name == "CaptureBuffer")
+    namespace = {"np": np}
+    exec(compile(ast.Module([node], []), SCRIPT, "exec"), namespace)
+    return namespace["CaptureBuffer"]
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+def run_variant(variant):
+    dtype = np.int16 if variant.endswith("int16") else np.float32
+    block = np.zeros((BLOCK, 1), dtype=dtype)
+    blocks = MINUTES * 60 * 16000 // BLOCK
+
+    if variant == "list":
+        audio_data = []
+        def callback(indata):
+            audio_data.append(indata.copy())
+        def release():
+            return np.concatenate(audio_data, axis=0)
+    else:
+        audio_data = load_capture_buffer()(dtype)
+        def callback(indata):
+            audio_data.append(indata)
+        def release():
+            return audio_data.read()
+
+    if resource is None:
+        tracemalloc.start()
+    baseline = peak_rss_mb() if resource is not None else 0.0
+
+    timings = np.empty(blocks)
+    for i in range(blocks):
+        # Vary the content a little so pages are really touched
+        block[0, 0] = i % 100
+        start = time.perf_counter()
+        callback(block)
+        timings[i] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    clip = release()
+    release_seconds = time.perf_counter() - start
+    assert len(clip) == blocks * BLOCK
+
+    if resource is not None:
+        peak = peak_rss_mb() - baseline
+    else:
+        peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+
+    return {
+        "mean_us": float(timings.mean() * 1e6),
+        "p99_us": float(np.percentile(timings, 99) * 1e6),
+        "max_us": float(timings.max() * 1e6),
+        "release_ms": release_seconds * 1000,
+        "peak_mb": peak,
+        "clip_mb": clip.nbytes / 1024 / 1024,
+    }
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--variant":
+        print(json.dumps(run_variant(sys.argv[2])))
+        return
+
+    memory = "peak RSS" if resource is not None else "peak traced"
+    print(f"{MINUTES}-minute dictation, {BLOCK}-frame blocks")
+    print(f"{'variant':<15} | {'callback mean':>13} | {'p99':>8} | {'max':>9} | {'release':>9} | {memory:>11} | {'clip':>8}")
+    print("-" * 92)
+    for variant in VARIANTS:
+        output = subprocess.run([sys.executable, __file__, "--variant", variant], capture_output=True, text=True, check=True).stdout
+        result = json.loads(output)
+        print(f"{variant:<15} | {result['mean_us']:>10.2f} us | {result['p99_us']:>5.1f} us | {result['max_us']:>6.0f} us | "
+              f"{result['release_ms']:>6.1f} ms | {result['peak_mb']:>8.1f} MB | {result['clip_mb']:>5.1f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# Benchmark for the WHISPERER_CODEC setting.
+# For every codec it reports the CPU time spent encoding, the payload size, and the
+# simulated time until the upload is done on a few typical uplinks, so you can pick the
+# codec that gets audio to Whisper fastest on your connection. Opus spends a little more
+# CPU but is an order of magnitude smaller, which wins on slow uplinks.
+#
+# Without arguments it uses synthetic speech-like fixture clips. Pass your own
+# recordings (anything soundfile can read, mono 16 kHz works best) to use those instead:
+#   python test-script/bench-codecs.py
+#   python test-script/bench-codecs.py my-dictation.flac other-clip.wav
+
+import io, os, sys, time
+import numpy as np
+import soundfile
+
+FIXTURE_SECONDS = [3, 15, 60]
+UPLINKS_MBIT = [1, 5, 20]
+REPEATS = 3
+
+# Same table as whisperer.py: extension, soundfile format and subtype
+CODECS = {
+    "flac": ("flac", "FLAC", "PCM_16"),
+    "opus": ("ogg", "OGG", "OPUS"),
+    "wav": ("wav", "WAV", "PCM_16"),
+}
+OPUS_KBPS = int(os.environ.get("WHISPERER_OPUS_KBPS", "24"))
+
+def make_clip(seconds, seed=0):
+    """Synthetic voiced speech: a 120 Hz harmonic source, moving formants, syllable envelope and a bit of noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * 16000)) / 16000
+    source = sum(np.sin(2 * np.pi * 120 * k * t) / k for k in range(1, 30))
+    formant = 1 + 0.5 * np.sin(2 * np.pi * 700 * t + 3 * np.sin(2 * np.pi * 2 * t))
+    envelope = np.clip(np.sin(2 * np.pi * 2.5 * t), 0, None) ** 0.5 * (np.sin(2 * np.pi * 0.15 * t) > -0.6)
+    clip = 0.05 * source * formant * envelope + 0.002 * rng.standard_normal(len(t))
+    return clip.astype(np.float32).reshape(-1, 1)
+
+def load_clip(path):
+    data, samplerate = soundfile.read(path, dtype='float32', always_2d=True)
+    data = data[:, :1]
+    if samplerate != 16000:
+        # Simple linear resampling is good enough for a size/speed comparison
+        positions = np.arange(0, len(data), samplerate / 16000)
+        data = np.interp(positions, np.arange(len(data)), data[:, 0]).astype(np.float32).reshape(-1, 1)
+    return data
+
+def encode(clip, codec):
+    extension, audio_format, subtype = CODECS[codec]
+    options = {}
+    if subtype == "OPUS":
+        options["compression_level"] = min(1.0, max(0.0, 1 - (OPUS_KBPS * 1000 - 6000) / 250000))
+    buffer = io.BytesIO()
+    soundfile.write(buffer, clip, 16000, format=audio_format, subtype=subtype, **options)
+    return buffer.getvalue()
+
+def main():
+    if len(sys.argv) > 1:
+        fixtures = [(os.path.basename(path), load_clip(path)) for path in sys.argv[1:]]
+    else:
+        fixtures = [(f"synthetic {seconds}s", make_clip(seconds, seed)) for seed, seconds in enumerate(FIXTURE_SECONDS)]
+
+    uplink_headers = " | ".join(f"{mbit:>3} Mbit/s" for mbit in UPLINKS_MBIT)
+    print(f"{'clip':<16} | {'codec':<5} | {'encode CPU':>10} | {'payload':>10} | {uplink_headers}")
+    print("-" * (52 + 13 * len(UPLINKS_MBIT)))
+
+    for name, clip in fixtures:
+        best = {}
+        for codec in CODECS:
+            cpu = []
+            for _ in range(REPEATS):
+                start = time.process_time()
+                data = encode(clip, codec)
+                cpu.append(time.process_time() - start)
+            encode_seconds = min(cpu)
+
+            totals = []
+            for mbit in UPLINKS_MBIT:
+                total = encode_seconds + len(data) * 8 / (mbit * 1_000_000)
+                totals.append(total)
+                if mbit not in best or total < best[mbit][1]:
+                    best[mbit] = (codec, total)
+
+            upload_columns = " | ".join(f"{total * 1000:>8.0f} ms" for total in totals)
+            print(f"{name:<16} | {codec:<5} | {encode_seconds * 1000:>7.1f} ms | {len(data) / 1024:>7.1f} KB | {upload_columns}")
+
+        fastest = ", ".join(f"{codec} at {mbit} Mbit/s" for mbit, (codec, _) in best.items())
+        print(f"{'':<16}   fastest: {fastest}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# Benchmark for the encode step in front of the Whisper upload.
+# It compares the old approach (write output.flac to disk, then reopen it for the upload)
+# with the in-memory approach used by whisperer.py (encode into a BytesIO buffer and hand
+# the bytes straight to the API client). For each clip length it reports how many bytes
+# were written to disk and how long it took until the upload body was ready to send.
+#
+# Run it from the project root:
+#   python test-script/bench-encode-upload.py
+
+import io, os, sys, time, tempfile
+import numpy as np
+import soundfile
+
+CLIP_SECONDS = [2, 10, 30, 120]
+REPEATS = 5
+
+def make_clip(seconds, seed=0):
+    """Synthetic speech-like clip: noise bursts shaped by a slow syllable envelope."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * 16000)) / 16000
+    envelope = np.clip(np.sin(2 * np.pi * 3 * t), 0, None) * (np.sin(2 * np.pi * 0.2 * t) > -0.5)
+    clip = rng.standard_normal(len(t)) * 0.1 * envelope
+    return clip.astype(np.float32).reshape(-1, 1)
+
+def upload_body_from_disk(clip, path):
+    soundfile.write(path, clip, 16000, format='flac')
+    with open(path, "rb") as file:
+        data = file.read()
+    return data, os.path.getsize(path)
+
+def upload_body_in_memory(clip):
+    buffer = io.BytesIO()
+    soundfile.write(buffer, clip, 16000, format='flac')
+    return buffer.getvalue(), 0
+
+def measure(fn):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        data, written = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(data), written
+
+def main():
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "output.flac")
+
+    print(f"{'clip':>6} | {'method':<10} | {'payload':>10} | {'disk writes':>11} | {'time to upload':>14}")
+    print("-" * 64)
+    for seconds in CLIP_SECONDS:
+        clip = make_clip(seconds)
+        for name, fn in (("disk", lambda: upload_body_from_disk(clip, path)),
+                         ("in-memory", lambda: upload_body_in_memory(clip))):
+            best, payload, written = measure(fn)
+            print(f"{seconds:>5}s | {name:<10} | {payload:>9}B | {written:>10}B | {best * 1000:>11.2f} ms")
+
+    os.remove(path)
+    os.rmdir(folder)
+
+if __name__ == "__main__":
+    sys.exit(main())
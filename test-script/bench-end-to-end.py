@@ -0,0 +1,182 @@
+# End-to-end latency benchmark for whisperer.py.
+# Runs recordings of different lengths through the real pipeline (the capture buffer read
+# on key release, then process_audio: VAD, encoding, the Whisper upload and the optional
+# translation) against a fake OpenAI server on localhost. The fake server has a
+# configurable response time per endpoint and upload bandwidth, so you can see how the
+# pipeline behaves on a slow connection without spending API credits. Typing the result
+# is not included, as that depends on the target window. sounddevice and pynput are
+# replaced by stand-ins, so it runs on a machine without PortAudio or a display.
+#
+# For every mode and clip length it prints the key-release-to-text latency distribution.
+# Save a run with --save and later runs are compared against it, to catch regressions.
+#
+# Run it from the project root:
+#   python test-script/bench-end-to-end.py
+#   python test-script/bench-end-to-end.py --whisper-ms 800 --kbps 256 --runs 20
+#   python test-script/bench-end-to-end.py --save        (store the baseline)
+
+import argparse, contextlib, io, itertools, json, os, sys, threading, time, types, importlib.util
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "whisperer.py")
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench-end-to-end-baseline.json")
+CLIP_SECONDS = [2, 5, 15, 30]
+MODES = {"transcribe": False, "translate": True}
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """Stand-in for the transcription, chat and models endpoints with a fixed delay and bandwidth."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        # Read the body at the configured upload bandwidth
+        remaining = int(self.headers.get("Content-Length", 0))
+        while remaining > 0:
+            chunk = self.rfile.read(min(remaining, 16384))
+            remaining -= len(chunk)
+            if self.server.bytes_per_second:
+                time.sleep(len(chunk) / self.server.bytes_per_second)
+
+        if self.path.endswith("/audio/transcriptions"):
+            time.sleep(self.server.whisper_seconds)
+            self.send({"text": "This is a synthetic transcript of the benchmark clip."})
+        else:
+            time.sleep(self.server.chat_seconds)
+            self.send({"id": "fake", "object": "chat.completion", "created": 0, "model": "fake",
+                       "choices": [{"index": 0, "finish_reason": "stop",
+                                    "message": {"role": "assistant", "content": "Dit is een synthetisch transcript."}}]})
+
+    def do_GET(self):
+        # Connection pre-warming asks for the model
+        self.send({"id": "whisper-1", "object": "model", "created": 0, "owned_by": "fake"})
+
+    def send(self, body):
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+def make_clip(seconds, seed):
+    """Synthetic speech-like clip: noise bursts shaped by a slow syllable envelope."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * 16000)) / 16000
+    envelope = np.clip(np.sin(2 * np.pi * 3 * t), 0, None) * (np.sin(2 * np.pi * 0.2 * t) > -0.5)
+    clip = rng.standard_normal(len(t)) * 0.1 * envelope
+    return clip.astype(np.float32).reshape(-1, 1)
+
+def stub_modules():
+    """Put stand-ins for sounddevice and pynput in sys.modules; the benchmark needs neither a
+    microphone nor a keyboard, but whisperer.py imports both at startup."""
+    sounddevice = types.ModuleType("sounddevice")
+    sounddevice.InputStream = sounddevice.OutputStream = object
+
+    keyboard = types.ModuleType("pynput.keyboard")
+    keyboard.Key = types.SimpleNamespace(ctrl="Key.ctrl", ctrl_r="Key.ctrl_r", shift_r="Key.shift_r")
+    keyboard.KeyCode = types.SimpleNamespace(from_char=lambda char: char)
+    keyboard.Listener = keyboard.Controller = object
+    pynput = types.ModuleType("pynput")
+    pynput.keyboard = keyboard
+
+    sys.modules.update({"sounddevice": sounddevice, "pynput": pynput, "pynput.keyboard": keyboard})
+
+def load_script():
+    stub_modules()
+    spec = importlib.util.spec_from_file_location("whisperer", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def run(whisperer, seconds, should_translate, seed):
+    """One recording: fill a capture buffer, then time key release until the text is ready."""
+    buffer = whisperer.CaptureBuffer(np.float32)
+    buffer.append(make_clip(seconds, seed))
+
+    # Keep the pipeline's progress output out of the report, but show it when the run fails
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        start = time.perf_counter()
+        text = whisperer.process_audio(buffer.read(), should_translate)
+        elapsed = time.perf_counter() - start
+    if text is None:
+        raise RuntimeError(f"no text for a {seconds}s clip, whisperer.py printed:\n{output.getvalue()}")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end latency benchmark for whisperer.py")
+    parser.add_argument("--runs", type=int, default=10, help="recordings per mode and clip length")
+    parser.add_argument("--whisper-ms", type=float, default=400, help="response time of the transcription endpoint")
+    parser.add_argument("--chat-ms", type=float, default=300, help="response time of the chat endpoint")
+    parser.add_argument("--kbps", type=float, default=1000, help="upload bandwidth in kbit/s (0 = unlimited)")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline file to compare with or save to")
+    parser.add_argument("--save", action="store_true", help="save this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed p50 slowdown before a result counts as a regression")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAI)
+    server.daemon_threads = True
+    server.whisper_seconds = args.whisper_ms / 1000
+    server.chat_seconds = args.chat_ms / 1000
+    server.bytes_per_second = args.kbps * 125
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Point the shared client at the fake server; main() isn't run, so set up what it would
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{server.server_port}/v1"
+    whisperer = load_script()
+    whisperer.api_key = "benchmark"
+    whisperer.whisper_breaker = whisperer.CircuitBreaker("Whisper")
+    whisperer.chat_breaker = whisperer.CircuitBreaker("Chat")
+    whisperer.spool = None
+
+    # One throwaway request opens the pooled connection, as pre-warming does in real use
+    run(whisperer, 2, False, seed=0)
+
+    results = {}
+    seeds = itertools.count(1)
+    print(f"Fake API: whisper {args.whisper_ms:.0f} ms, chat {args.chat_ms:.0f} ms, "
+          f"upload {'unlimited' if not args.kbps else f'{args.kbps:.0f} kbit/s'}, {args.runs} runs each")
+    print(f"{'mode':<10} | {'clip':>5} | {'p50':>8} | {'p95':>8} | {'max':>8}")
+    print("-" * 52)
+    for mode, should_translate in MODES.items():
+        for seconds in CLIP_SECONDS:
+            # Every run uses new audio, like real recordings
+            timings = [run(whisperer, seconds, should_translate, next(seeds)) for _ in range(args.runs)]
+            p50, p95 = np.percentile(timings, [50, 95]) * 1000
+            results[f"{mode}/{seconds}s"] = {"p50_ms": round(p50, 1), "p95_ms": round(p95, 1)}
+            print(f"{mode:<10} | {seconds:>4}s | {p50:>5.0f} ms | {p95:>5.0f} ms | {max(timings) * 1000:>5.0f} ms")
+    server.shutdown()
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump({"settings": vars(args), "results": results}, file, indent=2)
+        print(f"Saved the baseline to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline yet, run with --save to create one.")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    print(f"\nCompared with {args.baseline}:")
+    changed = [name for name in ("whisper_ms", "chat_ms", "kbps") if baseline["settings"].get(name) != getattr(args, name)]
+    if changed:
+        print(f"Note: the baseline was recorded with different {', '.join(changed)}, so the numbers aren't comparable.")
+    regressions = 0
+    for key, result in results.items():
+        if key not in baseline["results"]:
+            continue
+        before = baseline["results"][key]["p50_ms"]
+        change = (result["p50_ms"] - before) / before
+        flag = "REGRESSION" if change > args.tolerance else ""
+        regressions += bool(flag)
+        print(f"{key:<16} p50 {before:>6.0f} -> {result['p50_ms']:>6.0f} ms ({change:+.0%}) {flag}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# Benchmark for the transcription history (History and search_history in whisperer.py).
+# It fills a temporary history database with synthetic dictations through the same schema
+# and full-text index the app uses, then times a set of searches: single words, several
+# words, a phrase, a prefix and a word that never occurs. It also reports what History.add()
+# costs on the thread that types the text, which should stay in the microseconds.
+#
+# Run it from the project root:
+#   python test-script/bench-history-search.py
+#   python test-script/bench-history-search.py --entries 500000
+
+import argparse, ast, os, queue, random, sqlite3, sys, tempfile, threading, time
+import numpy as np
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "whisperer.py")
+NAMES = ["History", "open_history", "search_history"]
+QUERIES = ["meeting", "patient trial", '"quarterly budget"', "thera*", "zeppelin"]
+REPEATS = 20
+
+WORDS = ("the a and to of in we meeting budget quarterly report email patient trial cancer therapy "
+         "weekend project deadline review send call tomorrow please thanks dinner train").split()
+
+def load_functions():
+    """Take the history code straight from whisperer.py, so the benchmark always measures the real code."""
+    with open(SCRIPT, encoding="utf-8") as file:
+        tree = ast.parse(file.read())
+    nodes = [n for n in tree.body if isinstance(n, (ast.FunctionDef, ast.ClassDef)) and n.name in NAMES]
+    namespace = {"os": os, "queue": queue, "sqlite3": sqlite3, "threading": threading, "time": time}
+    exec(compile(ast.Module(nodes, []), SCRIPT, "exec"), namespace)
+    return namespace
+
+def fill(whisperer, path, entries, seed=0):
+    """Insert synthetic entries straight into the table, the insert trigger keeps the index up to date."""
+    rng = random.Random(seed)
+    db = whisperer["open_history"](path)
+    now = time.time()
+    with db:
+        db.executemany(
+            "INSERT INTO history (created, mode, raw, output, clip_seconds, latency_ms) VALUES (?, ?, ?, ?, ?, ?)",
+            ((now - (entries - i) * 60, "transcribe", text, text, len(text) / 15, 900.0)
+             for i, text in ((i, " ".join(rng.choices(WORDS, k=rng.randint(5, 40)))) for i in range(entries))),
+        )
+    db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Search speed of the whisperer.py transcription history")
+    parser.add_argument("--entries", type=int, default=300000, help="number of history entries to generate")
+    args = parser.parse_args()
+
+    whisperer = load_functions()
+    folder = tempfile.mkdtemp()
+    path = os.path.join(folder, "history.sqlite3")
+
+    start = time.perf_counter()
+    fill(whisperer, path, args.entries)
+    print(f"Filled {args.entries} entries in {time.perf_counter() - start:.1f}s "
+          f"({os.path.getsize(path) / 1024 / 1024:.0f} MB)")
+
+    # What the worker thread pays per transcript; the writes happen on the history thread
+    history = whisperer["History"](path, flush_seconds=0.5)
+    timings = []
+    for i in range(1000):
+        start = time.perf_counter()
+        history.add(f"extra entry {i}", f"extra entry {i}", "transcribe", 3.0, 0.9)
+        timings.append(time.perf_counter() - start)
+    history.close()
+    print(f"History.add(): p50 {np.percentile(timings, 50) * 1e6:.1f} us, max {max(timings) * 1e6:.1f} us")
+
+    print(f"{'query':<20} | {'results':>7} | {'p50':>9} | {'max':>9}")
+    print("-" * 54)
+    for query in QUERIES:
+        timings = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            rows = whisperer["search_history"](path, query)
+            timings.append(time.perf_counter() - start)
+        print(f"{query:<20} | {len(rows):>7} | {np.percentile(timings, 50) * 1000:>6.2f} ms | {max(timings) * 1000:>6.2f} ms")
+
+    for name in os.listdir(folder):
+        os.remove(os.path.join(folder, name))
+    os.rmdir(folder)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# Benchmark for the local transcription backends of whisperer-local.py.
+# Compares the PyTorch openai-whisper package (whisper.load_model) with the int8
+# CTranslate2 runtime (faster-whisper) on the same audio. For every backend it reports the
+# model load time, the wall time per clip, the real-time factor (RTF, transcription time
+# divided by audio length; below 1.0 is faster than real time) and the peak memory.
+# Every backend runs in its own process so their memory use doesn't mix.
+#
+# Backends that aren't installed are skipped. The same WHISPERER_LOCAL_* settings as
+# whisperer-local.py apply (model size, threads, compute type, beam size).
+#
+# Run it from the project root, ideally with a few real recordings:
+#   python test-script/bench-local-backends.py my-dictation.flac other-clip.wav
+# Without arguments it uses synthetic clips, which are fine for timing but produce
+# nonsense transcripts.
+
+import json, os, subprocess, sys, time
+import numpy as np
+
+BACKENDS = ["whisper", "faster-whisper"]
+FIXTURE_SECONDS = [5, 20]
+
+MODEL_SIZE = os.environ.get("WHISPERER_LOCAL_MODEL", "small.en")
+CPU_THREADS = int(os.environ.get("WHISPERER_LOCAL_THREADS", "0")) or os.cpu_count()
+COMPUTE_TYPE = os.environ.get("WHISPERER_LOCAL_COMPUTE_TYPE", "int8")
+BEAM_SIZE = int(os.environ.get("WHISPERER_LOCAL_BEAM_SIZE", "1"))
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def make_clip(seconds, seed=0):
+    """Synthetic voiced, speech-like clip (a harmonic source with a syllable envelope)."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * 16000)) / 16000
+    source = sum(np.sin(2 * np.pi * 120 * k * t) / k for k in range(1, 30))
+    envelope = np.clip(np.sin(2 * np.pi * 2.5 * t), 0, None) ** 0.5
+    return (0.05 * source * envelope + 0.002 * rng.standard_normal(len(t))).astype(np.float32)
+
+def load_fixtures(paths):
+    if not paths:
+        return [(f"synthetic {seconds}s", make_clip(seconds, seed)) for seed, seconds in enumerate(FIXTURE_SECONDS)]
+
+    import soundfile
+    fixtures = []
+    for path in paths:
+        data, samplerate = soundfile.read(path, dtype='float32', always_2d=True)
+        data = data[:, 0]
+        if samplerate != 16000:
+            positions = np.arange(0, len(data), samplerate / 16000)
+            data = np.interp(positions, np.arange(len(data)), data).astype(np.float32)
+        fixtures.append((os.path.basename(path), data))
+    return fixtures
+
+def peak_rss_mb():
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+def run_backend(backend, paths):
+    """Load one backend, transcribe every fixture and return the measurements."""
+    start = time.perf_counter()
+    if backend == "faster-whisper":
+        from faster_whisper import WhisperModel
+        model = WhisperModel(MODEL_SIZE, device="cpu", compute_type=COMPUTE_TYPE, cpu_threads=CPU_THREADS)
+        def transcribe(samples):
+            segments, info = model.transcribe(samples, beam_size=BEAM_SIZE)
+            return "".join(segment.text for segment in segments)
+    else:
+        import whisper
+        model = whisper.load_model(MODEL_SIZE)
+        def transcribe(samples):
+            return model.transcribe(samples, fp16=False)["text"]
+    load_seconds = time.perf_counter() - start
+
+    # Same warm-up as whisperer-local.py
+    transcribe(np.zeros(16000, dtype=np.float32))
+
+    clips = []
+    for name, samples in load_fixtures(paths):
+        start = time.perf_counter()
+        text = transcribe(samples)
+        wall = time.perf_counter() - start
+        clips.append({"name": name, "seconds": len(samples) / 16000, "wall": wall, "text": text.strip()[:60]})
+
+    return {"load": load_seconds, "clips": clips, "peak_mb": peak_rss_mb()}
+
+def main():
+    if len(sys.argv) >= 3 and sys.argv[1] == "--backend":
+        print(json.dumps(run_backend(sys.argv[2], sys.argv[3:])))
+        return
+
+    paths = sys.argv[1:]
+    print(f"model {MODEL_SIZE}, faster-whisper: {COMPUTE_TYPE}, beam {BEAM_SIZE}, threads {CPU_THREADS or 'all'}")
+    print(f"{'backend':<15} | {'clip':<18} | {'audio':>6} | {'wall':>8} | {'RTF':>5} | {'load':>6} | {'peak RSS':>9}")
+    print("-" * 84)
+    for backend in BACKENDS:
+        process = subprocess.run([sys.executable, __file__, "--backend", backend] + paths, capture_output=True, text=True)
+        if process.returncode != 0:
+            reason = process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "failed"
+            print(f"{backend:<15} | skipped: {reason}")
+            continue
+
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        for clip in result["clips"]:
+            print(f"{backend:<15} | {clip['name']:<18} | {clip['seconds']:>5.1f}s | {clip['wall']:>7.2f}s | "
+                  f"{clip['wall'] / clip['seconds']:>5.2f} | {result['load']:>5.1f}s | {result['peak_mb']:>6.0f} MB")
+            print(f"{'':<15} |   \"{clip['text']}\"")
+
+if __name__ == "__main__":
+    main()
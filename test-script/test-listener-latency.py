@@ -0,0 +1,125 @@
+# Checks that the keyboard listener callbacks of whisperer-NL-CR-SB-PG.py return quickly.
+# Everything slow (closing the input stream, encoding, Whisper, the LLM modes and typing)
+# has to happen on the background pipeline stages, otherwise key events stall while a
+# clip is in flight and a second recording can't start.
+#
+# sounddevice and pynput are replaced by stand-ins, so the test runs without PortAudio,
+# audio hardware or a display, and the clips are shorter than 1 second so nothing is
+# sent to the API. It also checks that a stream which is still being closed can't write
+# into the next recording, and that all PortAudio calls happen on one thread.
+#
+# Run it from the project root:
+#   python test-script/test-listener-latency.py
+
+import os, sys, time, types, threading, importlib.util
+import numpy as np
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "whisperer-NL-CR-SB-PG.py")
+ROUNDS = 200
+# Budgets for on_press and on_release: typical call, and the worst call (allowing for scheduler hiccups)
+MEDIAN_SECONDS = 0.0002
+MAX_SECONDS = 0.005
+
+class SlowStream:
+    """Stand-in for sd.InputStream whose start/stop/close are as slow as a real PortAudio stream."""
+
+    # Threads that called into the stand-in PortAudio
+    threads = set()
+
+    def __init__(self, callback=None, **kwargs):
+        self.callback = callback
+        SlowStream.threads.add(threading.get_ident())
+
+    def start(self):
+        SlowStream.threads.add(threading.get_ident())
+        time.sleep(0.02)
+        # Feed half a second of audio, like the device would while the key is held
+        block = np.zeros((512, 1), dtype=np.float32)
+        for _ in range(16):
+            self.callback(block, len(block), None, None)
+
+    def stop(self):
+        SlowStream.threads.add(threading.get_ident())
+        time.sleep(0.02)
+
+    def close(self):
+        SlowStream.threads.add(threading.get_ident())
+        time.sleep(0.01)
+
+def stub_modules():
+    """Put stand-ins for sounddevice and pynput in sys.modules, before the script imports them."""
+    sounddevice = types.ModuleType("sounddevice")
+    sounddevice.InputStream = SlowStream
+
+    keyboard = types.ModuleType("pynput.keyboard")
+    keyboard.Key = types.SimpleNamespace(**{name: f"Key.{name}" for name in
+                                            ("ctrl", "ctrl_r", "shift_r", "enter", "space", "tab")})
+    keyboard.KeyCode = types.SimpleNamespace(from_char=lambda char: char)
+    keyboard.Listener = keyboard.Controller = object
+    pynput = types.ModuleType("pynput")
+    pynput.keyboard = keyboard
+
+    sys.modules.update({"sounddevice": sounddevice, "pynput": pynput, "pynput.keyboard": keyboard})
+
+def summary(name, timings):
+    timings = sorted(timings)
+    median, worst = timings[len(timings) // 2], timings[-1]
+    print(f"{name}: median {median * 1e6:.1f} us, max {worst * 1e6:.1f} us over {len(timings)} recordings")
+    if median > MEDIAN_SECONDS or worst > MAX_SECONDS:
+        print(f"FAIL: {name} should take under {MEDIAN_SECONDS * 1e6:.0f} us "
+              f"(and never more than {MAX_SECONDS * 1e6:.0f} us)")
+        return False
+    return True
+
+def load_script():
+    stub_modules()
+    spec = importlib.util.spec_from_file_location("whisperer_nl", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def main():
+    whisperer = load_script()
+    whisperer.set_status = lambda text: None
+
+    press_timings, release_timings = [], []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        whisperer.on_press(whisperer.record_key)
+        press_timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        whisperer.on_release(whisperer.record_key)
+        release_timings.append(time.perf_counter() - start)
+    passed = summary("on_press", press_timings) & summary("on_release", release_timings)
+
+    # Double tap: the first stream delivers one more block after the second recording started
+    whisperer.on_press(whisperer.record_key)
+    first = whisperer.audio_data
+    first.opened.wait()
+    whisperer.on_release(whisperer.record_key)
+    whisperer.on_press(whisperer.record_key)
+    second = whisperer.audio_data
+    second.opened.wait()
+    before = len(second.audio_data)
+    first.stream.callback(np.ones((512, 1), dtype=np.float32), 512, None, None)
+    if len(second.audio_data) != before:
+        print("FAIL: a block from the previous stream ended up in the new recording")
+        passed = False
+    whisperer.on_release(whisperer.record_key)
+
+    # Let the capture stage close every stream, then check no two threads used PortAudio
+    while not whisperer.capture.queue.empty():
+        time.sleep(0.05)
+    time.sleep(0.1)
+    whisperer.stream_opener.submit(lambda: None).result()
+    if len(SlowStream.threads) != 1:
+        print(f"FAIL: streams were opened and closed on {len(SlowStream.threads)} different threads")
+        passed = False
+
+    if not passed:
+        return 1
+    print("PASS")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# Checks the retry, deadline and circuit breaker logic (call_api and CircuitBreaker) in whisperer.py.
+# A small fake OpenAI server runs on localhost and answers every request according to a
+# fault plan: rate limits, server errors, hanging connections, bad requests or a normal
+# answer. The real openai client talks to it, so the test covers the same exceptions
+# the scripts see in practice.
+#
+# Run it from the project root:
+#   python test-script/test-resilience.py
+
+import ast, json, os, sys, threading, time, itertools, random
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import openai
+
+SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "whisperer.py")
+NAMES = ["setting", "ApiUnavailable", "CircuitBreaker", "retryable_errors", "call_api"]
+
+# Keep the test quick: few retries and short deadlines
+os.environ["WHISPERER_MAX_RETRIES"] = "3"
+os.environ["WHISPERER_DEADLINE_SECONDS"] = "10"
+
+class FakeOpenAI(BaseHTTPRequestHandler):
+    """Answers from the server's fault plan: an int is an HTTP status, ("hang", s) sleeps, "ok" answers."""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.requests += 1
+        action = self.server.plan.pop(0) if self.server.plan else "ok"
+
+        if isinstance(action, tuple):
+            time.sleep(action[1])
+            action = "ok"
+        if action == "ok":
+            if self.path.endswith("/chat/completions"):
+                body = {"id": "fake", "object": "chat.completion", "created": 0, "model": "fake",
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": "hallo"}}]}
+            else:
+                body = {"text": "hello"}
+            self.send(200, body)
+        else:
+            self.send(action, {"error": {"message": f"injected {action}", "type": "fake"}})
+
+    def send(self, status, body):
+        data = json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            if status == 429 or status >= 500:
+                self.send_header("Retry-After", "0.05")
+            self.end_headers()
+            self.wfile.write(data)
+        except OSError:
+            # The client gave up (timeout) before the answer was ready
+            pass
+
+    def log_message(self, *args):
+        pass
+
+def load_functions():
+    """Take the resilience helpers straight from whisperer.py, so the test always checks the real code."""
+    with open(SCRIPT, encoding="utf-8") as file:
+        tree = ast.parse(file.read())
+    nodes = [n for n in tree.body
+             if (isinstance(n, (ast.FunctionDef, ast.ClassDef)) and n.name in NAMES)
+             or (isinstance(n, ast.Assign) and n.targets[0].id in NAMES)]
+    namespace = {"os": os, "openai": openai, "time": time, "threading": threading,
+                 "itertools": itertools, "random": random}
+    exec(compile(ast.Module(nodes, []), SCRIPT, "exec"), namespace)
+    return namespace
+
+def main():
+    whisperer = load_functions()
+    call_api, CircuitBreaker = whisperer["call_api"], whisperer["CircuitBreaker"]
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAI)
+    server.daemon_threads = True
+    server.plan, server.requests = [], 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = openai.OpenAI(api_key="test", base_url=f"http://127.0.0.1:{server.server_port}/v1", max_retries=0)
+
+    def transcribe(breaker, timeout=2.0):
+        return call_api(breaker, lambda t: client.audio.transcriptions.create(
+            model="whisper-1", file=("clip.flac", b"fake"), timeout=t), timeout).text
+
+    def chat(breaker, timeout=2.0):
+        return call_api(breaker, lambda t: client.chat.completions.create(
+            model="gpt-4o-mini", messages=[{"role": "user", "content": "hi"}], timeout=t), timeout)
+
+    def run(plan, work):
+        """Run work() against the given fault plan; returns (result or exception, requests, seconds)."""
+        server.plan, server.requests = list(plan), 0
+        start = time.perf_counter()
+        try:
+            result = work()
+        except Exception as e:
+            result = e
+        return result, server.requests, time.perf_counter() - start
+
+    failures = []
+    def check(name, condition, detail):
+        print(f"{'PASS' if condition else 'FAIL'}: {name} ({detail})")
+        if not condition:
+            failures.append(name)
+
+    breaker = CircuitBreaker("Whisper", threshold=2, reset_seconds=0.5)
+
+    result, requests, seconds = run([429, 500, 503], lambda: transcribe(breaker))
+    check("retries 429 and 5xx until it succeeds", result == "hello" and requests == 4,
+          f"{requests} requests, {seconds:.2f}s")
+
+    result, requests, seconds = run([("hang", 1.0)], lambda: transcribe(breaker, timeout=0.3))
+    check("a hung request times out and is retried", result == "hello" and requests == 2 and seconds < 1.5,
+          f"{requests} requests, {seconds:.2f}s")
+
+    result, requests, seconds = run([400], lambda: transcribe(breaker))
+    check("bad requests are not retried", isinstance(result, openai.BadRequestError) and requests == 1,
+          f"{type(result).__name__}, {requests} requests")
+
+    result, requests, seconds = run([500] * 4, lambda: transcribe(breaker))
+    check("gives up after WHISPERER_MAX_RETRIES", isinstance(result, openai.InternalServerError) and requests == 4,
+          f"{type(result).__name__}, {requests} requests")
+
+    run([500] * 4, lambda: transcribe(breaker))
+    result, requests, seconds = run([], lambda: transcribe(breaker))
+    check("an open breaker fails fast without calling the API",
+          isinstance(result, whisperer["ApiUnavailable"]) and requests == 0 and seconds < 0.05,
+          f"{type(result).__name__}, {requests} requests, {seconds * 1000:.1f} ms")
+
+    time.sleep(0.6)
+    result, requests, seconds = run([], lambda: transcribe(breaker))
+    check("a trial call after the reset period closes the breaker", result == "hello" and not breaker.is_open(),
+          f"{requests} requests, open: {breaker.is_open()}")
+
+    chat_breaker = CircuitBreaker("Chat", threshold=2, reset_seconds=0.5)
+    result, requests, seconds = run([429], lambda: chat(chat_breaker).choices[0].message.content)
+    check("chat completions use the same retries", result == "hallo" and requests == 2,
+          f"{requests} requests")
+
+    server.shutdown()
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        return 1
+    print("All checks passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+# Checks the voice activity detection (trim_silence) of whisperer.py and whisperer-NL-CR-SB-PG.py
+# on synthetic clips: near-silence must be dropped, leading and trailing silence trimmed,
+# and a clip that is speech from start to end (no pause to learn the noise floor from)
+# must be sent as it is.
+#
+# Run it from the project root:
+#   python test-script/test-vad.py
+
+import ast, os, sys
+import numpy as np
+
+FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SCRIPTS = ["whisperer.py", "whisperer-NL-CR-SB-PG.py"]
+NAMES = ["setting", "as_float", "trim_silence"]
+
+def load_functions(script):
+    """Take the VAD straight from the script, so the test always checks the real code."""
+    path = os.path.join(FOLDER, script)
+    with open(path, encoding="utf-8") as file:
+        tree = ast.parse(file.read())
+    nodes = [n for n in tree.body if isinstance(n, ast.FunctionDef) and n.name in NAMES]
+    namespace = {"os": os, "np": np}
+    exec(compile(ast.Module(nodes, []), path, "exec"), namespace)
+    return namespace
+
+def voiced(seconds, rng, level=0.1):
+    """Vowel-like sound: a 140 Hz tone with harmonics and a slow syllable rhythm."""
+    t = np.arange(int(seconds * 16000)) / 16000
+    tone = sum(np.sin(2 * np.pi * 140 * k * t) / k for k in range(1, 6))
+    rhythm = 0.7 + 0.3 * np.sin(2 * np.pi * 4 * t)
+    return level * tone * rhythm / 2 + rng.standard_normal(len(t)) * 0.001
+
+def noise(seconds, rng, level=0.0005):
+    return rng.standard_normal(int(seconds * 16000)) * level
+
+def main():
+    rng = np.random.default_rng(0)
+    clips = {
+        "silence": noise(3, rng),
+        "speech with silence around it": np.concatenate([noise(1.5, rng), voiced(2, rng), noise(1.5, rng)]),
+        "speech without any pause": voiced(3, rng),
+    }
+
+    failures = []
+    for script in SCRIPTS:
+        trim_silence = load_functions(script)["trim_silence"]
+        results = {name: trim_silence(clip.astype(np.float32).reshape(-1, 1)) for name, clip in clips.items()}
+        kept = {name: 0.0 if result is None else len(result) / 16000 for name, result in results.items()}
+
+        checks = [
+            ("silence is not sent", results["silence"] is None),
+            ("silence around speech is trimmed", 2.0 <= kept["speech with silence around it"] <= 3.0),
+            ("speech without a pause is kept", kept["speech without any pause"] >= 2.9),
+        ]
+        for name, condition in checks:
+            print(f"{'PASS' if condition else 'FAIL'}: {script}: {name} "
+                  f"(kept {', '.join(f'{seconds:.1f}s' for seconds in kept.values())})")
+            if not condition:
+                failures.append(f"{script}: {name}")
+
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        return 1
+    print("All checks passed")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
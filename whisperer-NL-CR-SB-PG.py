@@ -8,7 +8,7 @@
 # the user if the API key file is missing.
 
 
-import sys, os
+import sys, os, io, time, itertools, random, json
 import numpy as np
 import openai
 import pyperclip
@@ -19,6 +19,11 @@ import sounddevice as sd
 
 import tkinter as tk
 import threading
+import queue
+import sqlite3, hashlib
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
 
 # Only available on Windows by default:
 try:
@@ -28,18 +33,532 @@ except ImportError:
 
 # Initialize global variables
 recording = False
-audio_data = []
-stream = None
+audio_data = None  # the Recording that is in progress
 translate = False
 get_response = False  # New flag for ChatGPT response feature
 search_block = False  # New flag for search block feature
 improve_prompt = False  # New flag for improving prompts
 force_clipboard = False
 
+# Chat model used by the post-processing modes
+CHAT_MODEL = "gpt-4o-mini"
+
+# Modes whose answers are cached (see LLMCache)
+CACHED_MODES = ("translate", "search_block", "improve_prompt")
+
+# Created in main() unless WHISPERER_LLM_CACHE=0
+llm_cache = None
+
+# Every transcript and its output, searchable with whisperer.py --search (created in main() unless WHISPERER_HISTORY=0)
+history = None
+
+# Circuit breakers for the transcription and chat APIs (created in main())
+whisper_breaker = None
+chat_breaker = None
+
+# System prompts for the post-processing modes
+TRANSLATE_PROMPT = "You translate the input text to Dutch. You only output the translated text and nothing else. Avoid using the uw form as this is old fashioned"
+
+RESPONSE_PROMPT = "You are a helpful assistant. Respond directly to the user's query with useful information."
+
+SEARCH_BLOCK_PROMPT = """You are an expert in medical database search strategies. Convert the user's request into a properly formatted search block for PubMed and Medline. 
+                                 Format your response with the following rules:
+                                 1. Identify key concepts from the query
+                                 2. For each concept, create a search block with relevant synonyms/terms
+                                 3. Each term should include a [tiab] field code for pubmed and terms in brackets with .ti,ab,kf field tag for medline
+                                 4. Use Boolean operators 'OR' between terms within a concept block
+                                 5. Only present the individual search blocks
+                                 6. Only output the formatted search blocks without any explanations, introductions, or comments
+                                 For example:
+
+                                 User inputs: Cancer therapy
+                                 Output: 
+                                 PubMed syntax
+                                 ("neoplasm*"[tiab] OR cancer*[tiab] OR tumor*[tiab] OR tumour*[tiab] ect..)
+
+                                 Medline syntax
+                                 ("neoplasm*" OR cancer* OR tumor* OR tumour* ect...).ti,ab,kf"""
+
+IMPROVE_PROMPT_PROMPT = """You are an expert in crafting effective prompts for large language models. 
+                                 Take the user's input and transform it into a more effective, clear, and actionable prompt.
+                                 
+                                 Your improved prompt should:
+                                 1. Be clear and specific about the task
+                                 2. Provide necessary context
+                                 3. Specify the desired format or structure of the response when appropriate
+                                 4. Remove unnecessary words or vague language
+                                 5. Be formatted for optimal LLM understanding
+                                 6. Privide an example output format.
+                                 
+                                 Only output the improved prompt without explanations, introductions, or comments."""
+
+# Characters that keyboard.type() can produce without the clipboard
+TYPEABLE_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 .,;:!?-\'_')
+
 # We'll store references to our Tk objects here
 root = None
 status_label = None
 
+def setting(name, default):
+    """Read a WHISPERER_<name> setting from the environment (or .env file), falling back to default."""
+    value = os.environ.get(f"WHISPERER_{name}")
+    if value is None or value == "":
+        return default
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    return value
+
+class ApiUnavailable(Exception):
+    """Raised instead of calling an API whose circuit breaker is open."""
+
+class CircuitBreaker:
+    """Stops calling an API that keeps failing, so every clip doesn't wait for the same timeouts.
+
+    After `threshold` failed calls in a row the breaker opens and calls fail right away.
+    Once `reset_seconds` have passed, one trial call is let through: if it succeeds the
+    breaker closes again, if it fails the breaker stays open for another period.
+    """
+
+    def __init__(self, name, threshold=3, reset_seconds=30.0):
+        self.name = name
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if not self.trial_running and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.trial_running = True
+                return True
+            return False
+
+    def is_open(self):
+        with self.lock:
+            return self.opened_at is not None
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                print(f"The {self.name} API is reachable again.")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    print(f"The {self.name} API keeps failing, pausing calls for {self.reset_seconds:.0f}s.")
+                self.opened_at = time.monotonic()
+
+# Errors worth another attempt: rate limits, server errors, timeouts and dropped connections
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+def call_api(breaker, request, timeout):
+    """Call request(timeout) with retries, a deadline and a circuit breaker.
+
+    Retryable errors are retried with jittered exponential backoff (or the server's
+    Retry-After) until WHISPERER_MAX_RETRIES or WHISPERER_DEADLINE_SECONDS runs out.
+    Each attempt gets at most `timeout` seconds.
+    """
+    if not breaker.allow():
+        raise ApiUnavailable(f"the {breaker.name} API is unavailable")
+
+    deadline = time.monotonic() + setting("DEADLINE_SECONDS", 60.0)
+    max_retries = setting("MAX_RETRIES", 3)
+    for attempt in itertools.count():
+        remaining = deadline - time.monotonic()
+        try:
+            result = request(min(timeout, max(remaining, 0.1)))
+        except RETRYABLE_ERRORS as e:
+            # Full jitter keeps parallel jobs from retrying in lockstep
+            delay = random.uniform(0, min(8.0, 0.5 * 2 ** attempt))
+            response = getattr(e, "response", None)
+            retry_after = response.headers.get("retry-after") if response is not None else None
+            if retry_after is not None:
+                try:
+                    delay = float(retry_after)
+                except ValueError:
+                    pass
+            if attempt >= max_retries or time.monotonic() + delay >= deadline:
+                breaker.record_failure()
+                raise
+            print(f"{breaker.name} API error ({type(e).__name__}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+        except Exception:
+            # The API answered, just not with a result (bad request, bad key): it is up
+            breaker.record_success()
+            raise
+        else:
+            breaker.record_success()
+            return result
+
+class TextInjector:
+    """Puts text into the active window the fastest way that works.
+
+    Text with characters keyboard.type() can't produce is always pasted. Other text is
+    typed while that is expected to take less than WHISPERER_INJECT_MAX_TYPE_SECONDS,
+    judged by the typing speed measured so far, and pasted when it would take longer.
+    Longer typed text goes in chunks, and switches to pasting the rest if typing turns
+    out slower than expected. The user's clipboard is saved before the first paste and
+    restored by finish(), unless the clipboard was asked for explicitly.
+    """
+
+    def __init__(self, keyboard_controller, max_type_seconds=1.0, chunk_chars=32, restore_clipboard=True):
+        self.keyboard = keyboard_controller
+        self.max_type_seconds = max_type_seconds
+        self.chunk_chars = chunk_chars
+        self.restore_clipboard = restore_clipboard
+        # Running estimates, updated after every injection
+        self.type_rate = 100.0
+        self.paste_seconds = 0.1
+        self.saved_clipboard = None
+        self.keep_clipboard = False
+        self.last_pasted = None
+        self.totals = {}
+
+    def inject(self, text, use_clipboard=False):
+        """Type or paste text; returns the method used ("type", "chunks" or "paste")."""
+        start = time.perf_counter()
+        if use_clipboard or not TYPEABLE_CHARS.issuperset(text):
+            if not use_clipboard:
+                print("Special characters detected: " + str(set(text) - TYPEABLE_CHARS))
+            self.keep_clipboard = self.keep_clipboard or use_clipboard
+            method = "paste"
+            self._paste(text)
+        elif len(text) <= self.chunk_chars:
+            method = "type"
+            self._type(text)
+        elif len(text) / self.type_rate > self.max_type_seconds:
+            method = "paste"
+            self._paste(text)
+        else:
+            method = "chunks"
+            deadline = start + self.max_type_seconds
+            for offset in range(0, len(text), self.chunk_chars):
+                rest = text[offset:]
+                if time.perf_counter() + len(rest) / self.type_rate > deadline + self.paste_seconds:
+                    self._paste(rest)
+                    break
+                self._type(rest[:self.chunk_chars])
+
+        elapsed = time.perf_counter() - start
+        chars, seconds = self.totals.get(method, (0, 0.0))
+        self.totals[method] = (chars + len(text), seconds + elapsed)
+        print(f"Injected {len(text)} characters ({method}) in {elapsed * 1000:.0f} ms, "
+              f"{len(text) / max(elapsed, 1e-6):.0f} chars/s.")
+        return method
+
+    def _type(self, text):
+        start = time.perf_counter()
+        self.keyboard.type(text)
+        elapsed = time.perf_counter() - start
+        if elapsed > 0:
+            self.type_rate = 0.7 * self.type_rate + 0.3 * (len(text) / elapsed)
+
+    def _paste(self, text):
+        start = time.perf_counter()
+        if self.restore_clipboard and self.saved_clipboard is None:
+            try:
+                self.saved_clipboard = pyperclip.paste()
+            except pyperclip.PyperclipException:
+                self.saved_clipboard = None
+
+        # Copy the text to the clipboard
+        pyperclip.copy(text)
+        self.last_pasted = text
+
+        # Simulate CTRL-V to paste the text
+        self.keyboard.press(Key.ctrl)
+        self.keyboard.press('v')
+        self.keyboard.release('v')
+        self.keyboard.release(Key.ctrl)
+        self.paste_seconds = 0.7 * self.paste_seconds + 0.3 * (time.perf_counter() - start)
+
+    def finish(self):
+        """Put the user's clipboard back after the pastes of one job."""
+        saved, self.saved_clipboard = self.saved_clipboard, None
+        keep, self.keep_clipboard = self.keep_clipboard, False
+        if saved is None or keep:
+            return
+        # The target window reads the clipboard asynchronously after CTRL-V
+        time.sleep(0.1)
+        try:
+            # Leave it alone if something else was copied in the meantime
+            if pyperclip.paste() == self.last_pasted:
+                pyperclip.copy(saved)
+        except pyperclip.PyperclipException:
+            pass
+
+    def stats(self):
+        """Characters per second for each injection method so far."""
+        return {method: chars / seconds if seconds else 0.0 for method, (chars, seconds) in self.totals.items()}
+
+def stream_chunks(system_prompt, transcript_text, use_clipboard):
+    """Stream a chat completion and yield (text, use_clipboard) chunks as the tokens arrive.
+
+    Text is flushed on word boundaries, so every chunk gets its own clipboard-vs-type
+    decision. Chunks that need the clipboard are held until a sentence boundary (or a
+    minimum size), which keeps the number of pastes low.
+    """
+    response = call_api(chat_breaker, lambda timeout: openai.chat.completions.create(
+        model=CHAT_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": transcript_text},
+        ],
+        stream=True,
+        timeout=timeout,
+    ), setting("CHAT_TIMEOUT_SECONDS", 20.0))
+
+    pending = ""
+    for chunk in response:
+        if not chunk.choices:
+            continue
+        pending += chunk.choices[0].delta.content or ""
+
+        # Only flush complete words
+        cut = max(pending.rfind(" "), pending.rfind("\n")) + 1
+        if cut == 0:
+            continue
+        ready = pending[:cut]
+        if use_clipboard or set(ready) - TYPEABLE_CHARS:
+            # Pasting: wait for the end of a sentence (or enough text) before touching the clipboard
+            sentence_end = max(ready.rfind(mark) for mark in (". ", "! ", "? ", "\n")) + 1
+            if sentence_end == 0 and len(ready) < 80:
+                continue
+            if sentence_end > 0:
+                cut = sentence_end + (1 if ready[sentence_end - 1] != "\n" else 0)
+                ready = pending[:cut]
+        yield ready, use_clipboard
+        pending = pending[cut:]
+
+    if pending:
+        yield pending, use_clipboard
+
+class Tracer:
+    """Writes one JSONL record per pipeline stage of every recording (WHISPERER_TRACE=1).
+
+    Records carry the job id, the stage name, its start time and duration in milliseconds,
+    plus any extra fields such as the clip length or the upload size. Writing happens on
+    a background thread, so tracing only costs a queue put on the hot path. When tracing
+    is off, span() is a no-op.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.ids = itertools.count(1)
+        self.local = threading.local()
+        self.records = queue.SimpleQueue()
+        # Turns perf_counter() readings into wall-clock timestamps
+        self.epoch = time.time() - time.perf_counter()
+        if path:
+            threading.Thread(target=self._write, name="whisperer-trace", daemon=True).start()
+
+    def new_job(self):
+        return next(self.ids)
+
+    @contextmanager
+    def job(self, job_id):
+        """Spans opened on this thread inside the block belong to job_id."""
+        previous = getattr(self.local, "job", None)
+        self.local.job = job_id
+        try:
+            yield
+        finally:
+            self.local.job = previous
+
+    def span(self, stage, job=None, **fields):
+        """Time a block; fields added to the yielded dict end up in the record."""
+        if not self.path:
+            return nullcontext(fields)
+        return self._span(stage, job, fields)
+
+    @contextmanager
+    def _span(self, stage, job, fields):
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self.record(stage, job, start, **fields)
+
+    def record(self, stage, job, start, **fields):
+        """Record a stage that began at perf_counter() value start and ends now."""
+        if self.path:
+            seconds = time.perf_counter() - start
+            if job is None:
+                job = getattr(self.local, "job", None)
+            self.records.put({"job": job, "stage": stage, "start": round(self.epoch + start, 6),
+                              "ms": round(seconds * 1000, 3), **fields})
+
+    def _write(self):
+        with open(self.path, "a", encoding="utf-8") as file:
+            while True:
+                file.write(json.dumps(self.records.get()) + "\n")
+                # Write everything that is waiting before flushing
+                while not self.records.empty():
+                    file.write(json.dumps(self.records.get()) + "\n")
+                file.flush()
+
+# Disabled until main() reads WHISPERER_TRACE
+tracer = Tracer()
+
+class CaptureBuffer:
+    """Holds one recording in a single growable NumPy array and hands out zero-copy views of it."""
+
+    def __init__(self, dtype=np.float32, seconds=600, samplerate=16000):
+        self.data = np.empty(int(samplerate * seconds), dtype=dtype)
+        self.frames_written = 0
+
+    def __len__(self):
+        return self.frames_written
+
+    def append(self, block):
+        count = len(block)
+        if self.frames_written + count > len(self.data):
+            # Double the capacity; the old array stays valid for anyone holding a view of it
+            grown = np.empty(max(2 * len(self.data), self.frames_written + count), dtype=self.data.dtype)
+            grown[:self.frames_written] = self.data[:self.frames_written]
+            self.data = grown
+        self.data[self.frames_written:self.frames_written + count] = block[:, 0]
+        # Update the length last, so readers never see frames that aren't written yet
+        self.frames_written += count
+
+    def read(self, start=0, end=None):
+        """Zero-copy (frames, 1) view of frames [start, end) of the recording."""
+        end = self.frames_written if end is None else end
+        return self.data[start:end].reshape(-1, 1)
+
+class Recording:
+    """One press of the record key: a CaptureBuffer and the input stream that fills it.
+
+    The stream gets this recording's own callback, so a stream that is still being closed
+    by the capture stage can't write into the next recording (a double tap starts the next
+    one right away). Opening and closing PortAudio streams is slow, and PortAudio isn't
+    thread-safe, so both run on the single stream_opener thread, never on the listener.
+    """
+
+    def __init__(self, dtype):
+        self.dtype = dtype
+        self.audio_data = CaptureBuffer(dtype)
+        self.stream = None
+        self.active = True
+        self.opened = threading.Event()
+
+    def callback(self, indata, frames, time, status):
+        # Check if indata is mono; blocks after the key release are dropped
+        if self.active and indata.shape[1] == 1:
+            self.audio_data.append(indata)
+
+    def open(self):
+        try:
+            self.stream = sd.InputStream(callback=self.callback, channels=1, samplerate=16000, dtype=np.dtype(self.dtype).name)
+            self.stream.start()
+        except Exception as e:
+            print(f"Could not open the microphone: {str(e)}")
+        finally:
+            self.opened.set()
+
+    def stop(self):
+        """Stop collecting audio; cheap enough for the listener thread."""
+        self.active = False
+
+    def close(self):
+        self.opened.wait()
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+
+# Opens and closes the input streams, one at a time, in the order the record key was used
+stream_opener = ThreadPoolExecutor(max_workers=1, thread_name_prefix="whisperer-open")
+
+def as_float(audio_data_np):
+    """Float32 samples in -1..1, for level measurements on int16 or float32 recordings."""
+    if audio_data_np.dtype == np.int16:
+        return audio_data_np.astype(np.float32) / 32768
+    return audio_data_np
+
+def trim_silence(audio_data_np):
+    """Voice activity detection on a mono 16 kHz clip.
+
+    Trims silence at both ends, shortens long pauses in the middle and returns None when
+    nobody spoke at all. Works on 30 ms frames: a frame is speech when its energy is well
+    above the clip's noise floor, or moderately above it with a high zero-crossing rate
+    (quiet fricatives like "s" and "f"), or loud in absolute terms. The last rule keeps
+    clips without any pause, whose noise floor is the speech itself.
+    """
+    frame = 480
+    frames = len(audio_data_np) // frame
+    if frames == 0:
+        return None
+    samples = audio_data_np[:frames * frame, 0].reshape(frames, frame)
+    levels = as_float(samples)
+
+    energy = np.sqrt(np.mean(np.square(levels), axis=1))
+    crossings = np.mean(np.abs(np.diff(np.signbit(levels), axis=1)), axis=1)
+    noise_floor = np.percentile(energy, 10)
+    min_rms = setting("VAD_MIN_RMS", 0.002)
+    threshold = max(min_rms, noise_floor * 3)
+    speech = (energy > threshold) | ((energy > threshold / 2) & (crossings > 0.3)) | (energy > min_rms * 10)
+
+    if np.count_nonzero(speech) * frame < 16000 * setting("VAD_MIN_SPEECH_MS", 200) / 1000:
+        return None
+
+    # Keep some padding around speech so word onsets and endings aren't cut
+    pad = max(1, int(setting("VAD_PAD_MS", 200) / 30))
+    kernel = np.ones(2 * pad + 1, dtype=bool)
+    keep = np.convolve(speech, kernel, mode="same") > 0
+
+    # Collapse pauses longer than the limit to the limit
+    max_pause = max(2, int(setting("VAD_MAX_PAUSE_MS", 1000) / 30))
+    edges = np.diff(np.concatenate([[1], keep.astype(np.int8), [1]]))
+    starts = np.nonzero(edges == -1)[0]
+    ends = np.nonzero(edges == 1)[0]
+    for start, end in zip(starts, ends):
+        if start == 0 or end == frames:
+            # Leading and trailing silence is dropped completely
+            continue
+        if end - start > max_pause:
+            keep[start:end] = True
+            keep[start + max_pause // 2:end - max_pause // 2] = False
+        else:
+            keep[start:end] = True
+
+    return samples[keep].reshape(-1, 1)
+
+# Audio codecs Whisper accepts: file extension and soundfile format/subtype
+AUDIO_CODECS = {
+    "flac": ("flac", "FLAC", "PCM_16"),
+    "opus": ("ogg", "OGG", "OPUS"),
+    "wav": ("wav", "WAV", "PCM_16"),
+}
+
+def encode_clip(audio_data_np, codec):
+    """Encode a mono 16 kHz clip in memory with one of AUDIO_CODECS; returns (filename, bytes)."""
+    if codec not in AUDIO_CODECS:
+        raise ValueError(f"Unknown WHISPERER_CODEC '{codec}', use one of: {', '.join(AUDIO_CODECS)}")
+    extension, audio_format, subtype = AUDIO_CODECS[codec]
+    options = {}
+    if subtype == "OPUS":
+        # libsndfile maps compression_level 0..1 onto 256..6 kbit/s for Opus
+        kbps = setting("OPUS_KBPS", 24)
+        options["compression_level"] = min(1.0, max(0.0, 1 - (kbps * 1000 - 6000) / 250000))
+
+    buffer = io.BytesIO()
+    soundfile.write(buffer, audio_data_np, 16000, format=audio_format, subtype=subtype, **options)
+    return f"audio.{extension}", buffer.getvalue()
+
 def set_status(text):
     """Update the Tkinter status label (thread-safe)."""
     global root, status_label
@@ -89,6 +608,438 @@ def init_ui():
         status_label = None
         return False
 
+class LLMCache:
+    """Cache for the output of the LLM modes, so repeated phrases skip the network completely.
+
+    Keyed on the normalized transcript, the mode, the model and a hash of the system
+    prompt (so editing a prompt invalidates its old answers). A small in-memory LRU sits
+    in front of an SQLite file that survives restarts. The file is kept under a maximum
+    number of entries, and entries older than the maximum age are dropped.
+    """
+
+    def __init__(self, path, memory_entries=256, max_entries=5000, max_age_days=30):
+        self.memory = OrderedDict()
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 24 * 3600
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT, created REAL, used REAL)")
+        self.db.execute("CREATE INDEX IF NOT EXISTS llm_cache_used ON llm_cache (used)")
+        self._evict()
+
+    @staticmethod
+    def make_key(transcript_text, mode, model, system_prompt):
+        normalized = " ".join(transcript_text.split())
+        prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()
+        return hashlib.sha256("\0".join((normalized, mode, model, prompt_hash)).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.hits += 1
+                return self.memory[key]
+
+            now = time.time()
+            row = self.db.execute("SELECT value, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self.misses += 1
+                return None
+
+            self.db.execute("UPDATE llm_cache SET used = ? WHERE key = ?", (now, key))
+            self.db.commit()
+            self._remember(key, row[0])
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, value):
+        with self.lock:
+            now = time.time()
+            self._remember(key, value)
+            self.db.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?, ?)", (key, value, now, now))
+            self.db.commit()
+            self.puts += 1
+            if self.puts % 50 == 0:
+                self._evict()
+
+    def stats(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / total if total else 0.0}
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _evict(self):
+        self.db.execute("DELETE FROM llm_cache WHERE created < ?", (time.time() - self.max_age,))
+        self.db.execute(
+            "DELETE FROM llm_cache WHERE key NOT IN (SELECT key FROM llm_cache ORDER BY used DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        self.db.commit()
+
+class History:
+    """Searchable history of every transcription in an SQLite file (WHISPERER_HISTORY_PATH).
+
+    Each job stores the raw transcript, the mode, the final output, the clip length and
+    how long it took to produce the output. An FTS5 index over the transcript and the
+    output makes searches fast even with hundreds of thousands of entries. add() only
+    queues the record; a background thread writes whatever has gathered in one
+    transaction at most every flush_seconds, so saving never delays typing the text.
+    """
+
+    def __init__(self, path, flush_seconds=2.0, batch_size=100):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.records = queue.SimpleQueue()
+        self.db = open_history(path)
+        self.thread = threading.Thread(target=self._write, name="whisperer-history", daemon=True)
+        self.thread.start()
+
+    def add(self, raw, output, mode, clip_seconds=None, latency_seconds=None, created=None):
+        latency_ms = None if latency_seconds is None else round(latency_seconds * 1000, 1)
+        self.records.put((created or time.time(), mode, raw, output, clip_seconds, latency_ms))
+
+    def close(self):
+        """Write the records that are still waiting, for example on exit."""
+        self.records.put(None)
+        self.thread.join(5)
+
+    def _write(self):
+        while True:
+            batch = [self.records.get()]
+            # Gather more records for one transaction, until the batch is full or it's time to flush
+            deadline = time.monotonic() + self.flush_seconds
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self.records.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            rows = [record for record in batch if record is not None]
+            try:
+                with self.db:
+                    self.db.executemany(
+                        "INSERT INTO history (created, mode, raw, output, clip_seconds, latency_ms) VALUES (?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+            except sqlite3.Error as e:
+                print(f"Could not save {len(rows)} transcripts to the history: {str(e)}")
+            if batch[-1] is None:
+                self.db.close()
+                return
+
+def open_history(path):
+    """Open (and if needed create) the history database with its full-text index."""
+    db = sqlite3.connect(path, check_same_thread=False)
+    # Lets searches read while the app is writing
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY, created REAL, mode TEXT, raw TEXT, output TEXT,
+            clip_seconds REAL, latency_ms REAL);
+        CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+            raw, output, content='history', content_rowid='id', tokenize='unicode61 remove_diacritics 2');
+        CREATE TRIGGER IF NOT EXISTS history_insert AFTER INSERT ON history BEGIN
+            INSERT INTO history_fts (rowid, raw, output) VALUES (new.id, new.raw, new.output);
+        END;
+        CREATE TRIGGER IF NOT EXISTS history_delete AFTER DELETE ON history BEGIN
+            INSERT INTO history_fts (history_fts, rowid, raw, output) VALUES ('delete', old.id, old.raw, old.output);
+        END;
+    """)
+    return db
+
+class Stage:
+    """One step of the capture -> encode -> transcribe -> post-process -> inject pipeline.
+
+    Each stage runs on its own background thread and hands jobs to the next stage
+    through a queue, so the keyboard listener only has to enqueue a job and return.
+    Jobs flow through every stage in the order they were recorded.
+    """
+
+    def __init__(self, name, work, next_stage=None):
+        self.name = name
+        self.work = work
+        self.next_stage = next_stage
+        self.queue = queue.Queue()
+        threading.Thread(target=self._run, name=f"whisperer-{name}", daemon=True).start()
+
+    def put(self, job):
+        self.queue.put_nowait(job)
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                with tracer.span(self.name, job["id"]) as span:
+                    # A stage returns the job to pass it on, or None to drop it
+                    result = self.work(job)
+                    span.update((key, job[key]) for key in ("clip_seconds", "bytes") if key in job)
+            except Exception as e:
+                print(f"Error in {self.name} stage: {str(e)}")
+                result = None
+            if result is not None and self.next_stage is not None:
+                self.next_stage.put(result)
+
+def capture_stage(job):
+    """Close the input stream and turn the recorded blocks into one clip."""
+    global force_clipboard
+
+    # Stopping PortAudio can take a while, so it's done here instead of on the listener thread,
+    # on the thread that opens the streams
+    stream_opener.submit(job["recording"].close).result()
+
+    # Zero-copy view of the recording; the next recording gets a new buffer
+    audio_data_np = job["recording"].audio_data.read()
+    if len(audio_data_np) == 0:
+        print("No audio data recorded.")
+        return None
+
+    # Get length of audio data in seconds
+    audio_data_length = len(audio_data_np) / 16000
+    job["clip_seconds"] = round(audio_data_length, 2)
+
+    # A very short tap forces the next transcript to be pasted from the clipboard
+    if audio_data_length < 0.5:
+        force_clipboard = True
+
+    if audio_data_length < 1:
+        print("Audio data is less than 1 second long.")
+        return None
+
+    # Don't upload silence: trim it, and skip the API call if nobody spoke
+    if setting("VAD", True):
+        trimmed = trim_silence(audio_data_np)
+        if trimmed is None:
+            print("No speech detected, not sending the recording.")
+            return None
+        saved = len(audio_data_np) - len(trimmed)
+        print(f"Trimmed {saved / 16000:.1f}s of silence ({saved * 2 // 1024} KB of 16-bit audio) before upload.")
+        audio_data_np = trimmed
+
+    job["audio"] = audio_data_np
+    job["force_clipboard"] = force_clipboard
+    force_clipboard = False
+    return job
+
+def encode_stage(job):
+    """Encode the clip in memory with the configured codec."""
+    job["file"] = encode_clip(job.pop("audio"), setting("CODEC", "flac"))
+    job["bytes"] = len(job["file"][1])
+    return job
+
+def transcribe_stage(job):
+    """Send the clip to OpenAI Whisper."""
+    print("Sending audio data to OpenAI Whisper...")
+    client = openai.OpenAI(api_key=openai.api_key, max_retries=0)
+    file = job.pop("file")
+    transcript = call_api(whisper_breaker, lambda timeout: client.audio.transcriptions.create(
+        model="whisper-1",
+        file=file,
+        timeout=timeout,
+    ), setting("TRANSCRIBE_TIMEOUT_SECONDS", 30.0))
+    transcript_text = transcript.text
+
+    # Replace "New paragraph." with "\n"
+    transcript_text = transcript_text.replace("New paragraph.", "\n\n")
+
+    print("Transcript:")
+    print(transcript_text)
+
+    job["text"] = transcript_text
+    return job
+
+def post_process_stage(job):
+    """Run the LLM mode selected while recording and feed the output to the inject stage."""
+    transcript_text = raw_text = job["text"]
+
+    # Pick the system prompt for the mode selected while recording
+    system_prompt = None
+    mode = None
+    if job["translate"]:
+        print("Translating transcript to Dutch...")
+        system_prompt, mode = TRANSLATE_PROMPT, "translate"
+    # If get_response is true, get a ChatGPT response to the transcript text
+    elif job["get_response"]:
+        print("Getting response from ChatGPT...")
+        system_prompt, mode = RESPONSE_PROMPT, "response"
+    # If search_block is true, format the transcript as a medical database search block
+    elif job["search_block"]:
+        print("Creating search block for medical databases...")
+        system_prompt, mode = SEARCH_BLOCK_PROMPT, "search_block"
+    # If improve_prompt is true, format the transcript as a better LLM prompt
+    elif job["improve_prompt"]:
+        print("Improving transcript as an LLM prompt...")
+        system_prompt, mode = IMPROVE_PROMPT_PROMPT, "improve_prompt"
+
+    # Answers to the same input can be reused, except for free-form ChatGPT responses
+    cache_key = None
+    if llm_cache is not None and mode in CACHED_MODES:
+        cache_key = LLMCache.make_key(transcript_text, mode, CHAT_MODEL, system_prompt)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            stats = llm_cache.stats()
+            print(f"Using cached answer ({stats['hits']} hits, {stats['misses']} misses):")
+            print(cached)
+            transcript_text, system_prompt = cached, None
+
+    # The inject stage types chunks as they show up, ending with None
+    job["chunks"] = queue.Queue()
+    inject.put(job)
+    parts = []
+    try:
+        if system_prompt is not None and setting("STREAM_CHAT", False):
+            # Type the answer into the active window while it is being generated
+            with tracer.span(mode, job["id"], stream=True):
+                for chunk in stream_chunks(system_prompt, transcript_text, job["force_clipboard"]):
+                    parts.append(chunk[0])
+                    job["chunks"].put(chunk)
+            print("".join(parts))
+            if cache_key is not None:
+                llm_cache.put(cache_key, "".join(parts))
+        else:
+            if system_prompt is not None:
+                with tracer.span(mode, job["id"]):
+                    result = call_api(chat_breaker, lambda timeout: openai.chat.completions.create(
+                        model=CHAT_MODEL,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": transcript_text},
+                        ],
+                        timeout=timeout,
+                    ), setting("CHAT_TIMEOUT_SECONDS", 20.0))
+
+                transcript_text = result.choices[0].message.content
+                print(transcript_text)
+                if cache_key is not None:
+                    llm_cache.put(cache_key, transcript_text)
+
+            job["chunks"].put((transcript_text, job["force_clipboard"]))
+    except (ApiUnavailable, openai.APIError) as e:
+        # Part of a streamed answer may already be typed, don't add the transcript after it
+        if parts:
+            raise
+        # Better the plain transcript than nothing at all
+        print(f"Skipping the {mode} mode, the chat API failed: {str(e)}")
+        job["chunks"].put((transcript_text, job["force_clipboard"]))
+    finally:
+        job["chunks"].put(None)
+
+    if history is not None:
+        output = "".join(parts) if parts else transcript_text
+        history.add(raw_text, output, mode or "transcribe", job.get("clip_seconds"),
+                    time.perf_counter() - job["released"])
+
+    # Already handed to the inject stage
+    return None
+
+def inject_stage(job):
+    """Type or paste the output into the active window, chunk by chunk."""
+    for text, use_clipboard in iter(job["chunks"].get, None):
+        if injector.inject(text, use_clipboard) == "paste":
+            # Give the target window time to read the clipboard before it changes again
+            time.sleep(0.05)
+    injector.finish()
+    # Key release to text in the window
+    tracer.record("total", job["id"], job["released"])
+    return None
+
+# The pipeline, built back to front so every stage knows where to send its jobs
+inject = Stage("inject", inject_stage)
+post_process = Stage("post-process", post_process_stage)
+transcribe = Stage("transcribe", transcribe_stage, post_process)
+encode = Stage("encode", encode_stage, transcribe)
+capture = Stage("capture", capture_stage, encode)
+
+# Key to hold down to start recording
+record_key = Key.ctrl_r
+
+# Key to tap turn on translation
+translate_key = Key.shift_r
+
+# Key to tap to get ChatGPT response - using ENTER instead of slash
+response_key = Key.enter
+# Also keep the original slash key as an alternative
+response_key_alt = KeyCode.from_char('/')
+
+# Key to tap to get search block formatting
+search_block_key = Key.space
+
+# Key to tap to improve prompt for LLMs
+improve_prompt_key = Key.tab
+
+# Created in main(), used by the inject stage
+keyboard = None
+injector = None
+
+def on_press(key):
+    global recording, audio_data, translate, get_response, search_block, improve_prompt
+
+    # Debug print to see what keys are being pressed
+    # print(f"Key pressed: {key}")  # Removed this comment to print every key which is pressed
+
+    if key == record_key and not recording:
+        recording = True
+        translate = False
+        get_response = False
+        search_block = False
+        improve_prompt = False
+        set_status("Recording...")
+
+        # Capturing in int16 halves the memory a recording needs
+        capture_dtype = np.int16 if setting("CAPTURE_INT16", False) else np.float32
+        audio_data = Recording(capture_dtype)
+
+        # Starting the InputStream takes tens of milliseconds, too long for the listener thread
+        stream_opener.submit(audio_data.open)
+
+    # If recording and the translate key is pressed, set translate to True and throw away the keypress.
+    if recording and key == translate_key:
+        print("Translate key pressed.")
+        translate = True
+    
+    # If recording and either response key is pressed, set get_response to True
+    if recording and (key == response_key or key == response_key_alt):
+        print("Response key pressed.")
+        get_response = True
+        
+    # If recording and the search block key is pressed, set search_block to True
+    if recording and key == search_block_key:
+        print("Search block key pressed.")
+        search_block = True
+    
+    # If recording and the improve prompt key is pressed, set improve_prompt to True
+    if recording and key == improve_prompt_key:
+        print("Improve prompt key pressed.")
+        improve_prompt = True
+
+def on_release(key):
+    global recording
+
+    if key == record_key and recording:
+        recording = False
+        audio_data.stop()
+
+        # Hand everything to the capture stage; all the slow work happens off the listener thread
+        capture.put({
+            "id": tracer.new_job(),
+            "released": time.perf_counter(),
+            "recording": audio_data,
+            "translate": translate,
+            "get_response": get_response,
+            "search_block": search_block,
+            "improve_prompt": improve_prompt,
+        })
+        set_status("Idle")
+
 def main():
     try:
         # Load environment variables
@@ -118,23 +1069,6 @@ def main():
         print("Press CTRL+C to exit")
         print("Waiting for input...")
 
-        # Key to hold down to start recording
-        record_key = Key.ctrl_r
-
-        # Key to tap turn on translation
-        translate_key = Key.shift_r
-        
-        # Key to tap to get ChatGPT response - using ENTER instead of slash
-        response_key = Key.enter
-        # Also keep the original slash key as an alternative
-        response_key_alt = KeyCode.from_char('/')
-        
-        # Key to tap to get search block formatting
-        search_block_key = Key.space
-        
-        # Key to tap to improve prompt for LLMs
-        improve_prompt_key = Key.tab
-
         # Print a nice message if the API key file isn't present.
         try:
             with open(api_key_path, 'r') as file:
@@ -147,225 +1081,35 @@ def main():
         with open(api_key_path, 'r') as file:
             openai.api_key = file.read().strip()
 
-        # Callback function to collect audio data
-        def callback(indata, frames, time, status):
-            global audio_data
-            if recording:
-                # Check if indata has the expected shape (e.g., (32,))
-                if indata.shape[1] == 1:  # Check if indata is mono
-                    audio_data.append(indata.copy())
-                else:
-                    # Resize indata or discard it
-                    pass
-
+        global keyboard, injector, llm_cache, whisper_breaker, chat_breaker, tracer, history
+        if setting("TRACE", False):
+            tracer = Tracer(setting("TRACE_PATH", "trace.jsonl"))
         keyboard = Controller()
+        injector = TextInjector(
+            keyboard,
+            setting("INJECT_MAX_TYPE_SECONDS", 1.0),
+            setting("INJECT_CHUNK_CHARS", 32),
+            setting("RESTORE_CLIPBOARD", True),
+        )
 
-        # Initialize the sound device
-        def on_press(key):
-            global recording, stream, audio_data, translate, get_response, search_block, improve_prompt
-
-            # Debug print to see what keys are being pressed
-            # print(f"Key pressed: {key}")  # Removed this comment to print every key which is pressed
-
-            if key == record_key and not recording:
-                recording = True
-                translate = False
-                get_response = False
-                search_block = False
-                improve_prompt = False
-                set_status("Recording...")
-
-                audio_data = []
-              
-                # Initialize and start InputStream
-                stream = sd.InputStream(callback=callback, channels=1, samplerate=16000)
-                stream.start()
-
-            # If recording and the translate key is pressed, set translate to True and throw away the keypress.
-            if recording and key == translate_key:
-                print("Translate key pressed.")
-                translate = True
-            
-            # If recording and either response key is pressed, set get_response to True
-            if recording and (key == response_key or key == response_key_alt):
-                print("Response key pressed.")
-                get_response = True
-                
-            # If recording and the search block key is pressed, set search_block to True
-            if recording and key == search_block_key:
-                print("Search block key pressed.")
-                search_block = True
-            
-            # If recording and the improve prompt key is pressed, set improve_prompt to True
-            if recording and key == improve_prompt_key:
-                print("Improve prompt key pressed.")
-                improve_prompt = True
-        
-        # Initialize the sound device
-        def on_release(key):
-            global recording, stream, translate, get_response, search_block, improve_prompt, force_clipboard
-
-            if key == record_key:
-                recording = False
-                set_status("Idle")
-
-                # Stop and close InputStream
-                if stream is not None:
-                    stream.stop()
-                    stream.close()
-                    stream = None
-
-                if audio_data == []:
-                    print("No audio data recorded.")
-                    return
-              
-                # Concatenate all audio data into one NumPy array
-                audio_data_np = np.concatenate(audio_data, axis=0)
-
-                # Get length of audio data in seconds
-                audio_data_length = len(audio_data_np) / 16000
-
-                if audio_data_length < 0.5:
-                    force_clipboard = True
-
-                if audio_data_length < 1:
-                    print("Audio data is less than 1 second long.")
-                    return
-
-                # Write audio data to file
-                soundfile.write('output.flac', audio_data_np, 16000, format='flac')
-              
-                # Save or send the audio data to OpenAI Whisper
-                with open("output.flac", "rb") as file:
-                    print("Sending audio data to OpenAI Whisper...")
-                    client = openai.OpenAI(api_key=openai.api_key)
-                    transcript = client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=file,
-                
-                    )
-                    transcript_text = transcript.text
-
-                    # Replace "New paragraph." with "\n"
-                    transcript_text = transcript_text.replace("New paragraph.", "\n\n")
-
-                    print("Transcript:")
-                    print(transcript_text)
-
-                    if translate:
-                        translate = False
-
-                        print("Translating transcript to Dutch...")
-                        result = openai.chat.completions.create(
-                            model="gpt-4o-mini",
-                            messages=[
-                                {"role": "system", "content": "You translate the input text to Dutch. You only output the translated text and nothing else. Avoid using the uw form as this is old fashioned"},
-                                {"role": "user", "content": transcript_text},
-                            ]
-                        )
-
-                        transcript_text = result.choices[0].message.content
-                        print(transcript_text)
-                    
-                    # If get_response is true, get a ChatGPT response to the transcript text
-                    elif get_response:
-                        get_response = False
-                        
-                        print("Getting response from ChatGPT...")
-                        result = openai.chat.completions.create(
-                            model="gpt-4o-mini",
-                            messages=[
-                                {"role": "system", "content": "You are a helpful assistant. Respond directly to the user's query with useful information."},
-                                {"role": "user", "content": transcript_text},
-                            ]
-                        )
-                        
-                        transcript_text = result.choices[0].message.content
-                        print(transcript_text)
-                        
-                    # If search_block is true, format the transcript as a medical database search block
-                    elif search_block:
-                        search_block = False
-                        
-                        print("Creating search block for medical databases...")
-                        result = openai.chat.completions.create(
-                            model="gpt-4o-mini",
-                            messages=[
-                                {"role": "system", 
-                                 "content": """You are an expert in medical database search strategies. Convert the user's request into a properly formatted search block for PubMed and Medline. 
-                                 Format your response with the following rules:
-                                 1. Identify key concepts from the query
-                                 2. For each concept, create a search block with relevant synonyms/terms
-                                 3. Each term should include a [tiab] field code for pubmed and terms in brackets with .ti,ab,kf field tag for medline
-                                 4. Use Boolean operators 'OR' between terms within a concept block
-                                 5. Only present the individual search blocks
-                                 6. Only output the formatted search blocks without any explanations, introductions, or comments
-                                 For example:
+        # Retries are handled by call_api, which also knows about the circuit breakers
+        openai.max_retries = 0
+        whisper_breaker = CircuitBreaker("Whisper", setting("BREAKER_THRESHOLD", 3), setting("BREAKER_RESET_SECONDS", 30.0))
+        chat_breaker = CircuitBreaker("Chat", setting("BREAKER_THRESHOLD", 3), setting("BREAKER_RESET_SECONDS", 30.0))
 
-                                 User inputs: Cancer therapy
-                                 Output: 
-                                 PubMed syntax
-                                 ("neoplasm*"[tiab] OR cancer*[tiab] OR tumor*[tiab] OR tumour*[tiab] ect..)
+        # Remember LLM answers across restarts
+        if setting("LLM_CACHE", True):
+            llm_cache = LLMCache(
+                setting("LLM_CACHE_PATH", "llm-cache.sqlite3"),
+                setting("LLM_CACHE_MEMORY_ENTRIES", 256),
+                setting("LLM_CACHE_MAX_ENTRIES", 5000),
+                setting("LLM_CACHE_MAX_AGE_DAYS", 30),
+            )
+
+        # Save every transcript to a searchable history
+        if setting("HISTORY", True):
+            history = History(setting("HISTORY_PATH", "history.sqlite3"), setting("HISTORY_FLUSH_SECONDS", 2.0))
 
-                                 Medline syntax
-                                 ("neoplasm*" OR cancer* OR tumor* OR tumour* ect...).ti,ab,kf"""},
-                                    
-                            
-                                {"role": "user", "content": transcript_text}
-                            ]
-                        )
-                        
-                        transcript_text = result.choices[0].message.content
-                        print(transcript_text)
-
-                    # If improve_prompt is true, format the transcript as a better LLM prompt
-                    elif improve_prompt:
-                        improve_prompt = False
-                        
-                        print("Improving transcript as an LLM prompt...")
-                        result = openai.chat.completions.create(
-                            model="gpt-4o-mini",
-                            messages=[
-                                {"role": "system", 
-                                 "content": """You are an expert in crafting effective prompts for large language models. 
-                                 Take the user's input and transform it into a more effective, clear, and actionable prompt.
-                                 
-                                 Your improved prompt should:
-                                 1. Be clear and specific about the task
-                                 2. Provide necessary context
-                                 3. Specify the desired format or structure of the response when appropriate
-                                 4. Remove unnecessary words or vague language
-                                 5. Be formatted for optimal LLM understanding
-                                 6. Privide an example output format.
-                                 
-                                 Only output the improved prompt without explanations, introductions, or comments."""},
-                                {"role": "user", "content": transcript_text}
-                            ]
-                        )
-                        
-                        transcript_text = result.choices[0].message.content
-                        print(transcript_text)
-
-                    # Determine if any special characters are being used that can't be
-                    # typed using keyboard.type(). These are any characters that aren't in English
-                    allowed_chars = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 .,;:!?-\'_')
-                    special_chars = set(transcript_text) - allowed_chars
-                    if len(special_chars) > 0 or force_clipboard:
-                        print("Special characters detected: " + str(special_chars))
-
-                        # Copy the transcript text to the clipboard
-                        pyperclip.copy(transcript_text)
-
-                        # Simulate CTRL-V to paste the text
-                        keyboard.press(Key.ctrl)
-                        keyboard.press('v')
-                        keyboard.release('v')
-                        keyboard.release(Key.ctrl)
-                        force_clipboard = False
-                    else:  
-                        # Since there are no accents, we can just use the standard type command.
-                        keyboard.type(transcript_text)
-              
         # Start listening for key events
         with Listener(on_press=on_press, on_release=on_release) as listener:
             listener.join()
@@ -376,6 +1120,8 @@ def main():
     except Exception as e:
         print(f"\nAn error occurred: {str(e)}")
     finally:
+        if history is not None:
+            history.close()
         print("\nPress Enter to exit...")
         input()
 
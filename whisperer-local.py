@@ -1,10 +1,13 @@
+import os
+import time
+import threading
 import sounddevice as sd
 import numpy as np
 import openai
 import pyperclip
 from pynput.keyboard import Listener, Controller, Key, KeyCode
-from scipy.io.wavfile import write
-import whisper
+
+startup_time = time.perf_counter()
 
 # Path to the file containing your OpenAI API key
 api_key_path = 'openai_api_key.txt'
@@ -25,7 +28,61 @@ translate = False
 # If true, the transcript will be copied to the clipboard even it doesn't contain any special characters.
 force_clipboard = False
 
-model = whisper.load_model("small.en")
+def setting(name, default):
+  """Read a WHISPERER_<name> setting from the environment, falling back to default."""
+  value = os.environ.get(f"WHISPERER_{name}")
+  if value is None or value == "":
+    return default
+  if isinstance(default, int):
+    return int(value)
+  return value
+
+# Local transcription backend, chosen at startup:
+#   whisper         - the PyTorch openai-whisper package
+#   faster-whisper  - CTranslate2 runtime with int8 weights, much faster on CPU-only machines
+backend = setting("LOCAL_BACKEND", "whisper")
+model_size = setting("LOCAL_MODEL", "small.en")
+# faster-whisper only: CPU threads (0 = all cores), weight type and beam width (1 = greedy, like whisper's default)
+# CTranslate2 reads cpu_threads=0 as its own default of 4 threads, so 0 is turned into the core count here
+cpu_threads = setting("LOCAL_THREADS", 0) or os.cpu_count()
+compute_type = setting("LOCAL_COMPUTE_TYPE", "int8")
+beam_size = setting("LOCAL_BEAM_SIZE", 1)
+
+initial_prompt = "How are you doing today? I'm really looking forward to seeing you again!"
+
+# The Whisper model is loaded on a background thread, so the key listener is ready right away
+model = None
+model_ready = threading.Event()
+first_clip = True
+
+def transcribe_local(samples):
+  """Transcribe float32 16 kHz samples with the selected backend."""
+  if backend == "faster-whisper":
+    segments, info = model.transcribe(samples, beam_size=beam_size, initial_prompt=initial_prompt)
+    # Segments are decoded lazily while iterating
+    return "".join(segment.text for segment in segments)
+  return model.transcribe(samples, initial_prompt=initial_prompt, fp16=False)["text"]
+
+def load_model():
+  global model
+  try:
+    if backend == "faster-whisper":
+      from faster_whisper import WhisperModel
+      model = WhisperModel(model_size, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+    else:
+      # Importing whisper pulls in PyTorch, which alone takes seconds
+      import whisper
+      model = whisper.load_model(model_size)
+
+    # Run one tiny inference so the first real clip doesn't pay for lazy initialisation
+    transcribe_local(np.zeros(16000, dtype=np.float32))
+    print(f"{backend} model {model_size} ready {time.perf_counter() - startup_time:.1f}s after startup.")
+  except Exception as e:
+    print(f"Could not load the Whisper model: {str(e)}")
+  finally:
+    model_ready.set()
+
+threading.Thread(target=load_model, daemon=True).start()
 
 # Print a nice message if the API key file isn't present.
 try:
@@ -72,7 +129,7 @@ def on_press(key):
       translate = True
       
 def on_release(key):
-    global recording, stream, translate, force_clipboard
+    global recording, stream, translate, force_clipboard, first_clip
 
     if key == record_key:
       recording = False
@@ -102,11 +159,19 @@ def on_release(key):
         print("Audio data is less than 1 second long.")
         return
 
-      # Write audio data to file
-      write("output.wav", 16000, audio_data_np)
-      
-      result = model.transcribe("output.wav", initial_prompt="How are you doing today? I'm really looking forward to seeing you again!", fp16=False)
-      transcript_text = result["text"]
+      if not model_ready.is_set():
+        print("Waiting for the Whisper model to finish loading...")
+        model_ready.wait()
+      if model is None:
+        return
+
+      # Hand the samples straight to the model, no WAV file round trip
+      start = time.perf_counter()
+      transcript_text = transcribe_local(audio_data_np[:, 0].astype(np.float32))
+
+      label = "First clip" if first_clip else "Clip"
+      first_clip = False
+      print(f"{label}: transcribed {audio_data_length:.1f}s of audio in {time.perf_counter() - start:.2f}s.")
 
       # Replace "New paragraph." with "\n"
       transcript_text = transcript_text.replace("New paragraph.", "\n\n")
@@ -121,16 +186,17 @@ def on_release(key):
         translate = False
 
         print("Translating transcript to French...")
-        result = openai.ChatCompletion.create(
+        client = openai.OpenAI(api_key=openai.api_key, timeout=60.0)
+        result = client.chat.completions.create(
           model="gpt-4",
           messages=[
             {"role": "system", "content": "You translate the input text to Quebec French. You only output the text and nothing else."},
             # {"role": "system", "content": "You take the input and make it polite, business appropriate, and kind. You only output the text and nothing else."},
             {"role": "user", "content": transcript_text},
-          ]
+          ],
         )
 
-        transcript_text = result["choices"][0]["message"]["content"]
+        transcript_text = result.choices[0].message.content
         print(transcript_text)
 
       # Determine if any special characters are being used that can't be
@@ -154,6 +220,8 @@ def on_release(key):
         # Since there are no accents, we can just use the standard type command.
         keyboard.type(transcript_text)
       
+print(f"Listening for the record key {time.perf_counter() - startup_time:.2f}s after startup.")
+
 # Start listening for key events
 with Listener(on_press=on_press, on_release=on_release) as listener:
     listener.join()
@@ -137,6 +137,9 @@ def main():
         with open(api_key_path, 'r') as file:
             openai.api_key = file.read().strip()
 
+        # Don't let a hung request block the script forever (the client retries 429/5xx itself)
+        openai.timeout = 60.0
+
         # Callback function to collect audio data
         def callback(indata, frames, time, status):
             global audio_data
@@ -205,7 +208,7 @@ def main():
                 # Save or send the audio data to OpenAI Whisper
                 with open("output.flac", "rb") as file:
                     print("Sending audio data to OpenAI Whisper...")
-                    client = openai.OpenAI(api_key=openai.api_key)
+                    client = openai.OpenAI(api_key=openai.api_key, timeout=60.0)
                     transcript = client.audio.transcriptions.create(
                         model="whisper-1",
                         file=file,
@@ -8,16 +8,17 @@
 # the user if the API key file is missing.
 
 
-import sys, os
+import sys, os, time
+
+# Time since launch, printed once the listener is running
+startup_time = time.perf_counter()
+
 import numpy as np
-import openai
-import pyperclip
 from pynput.keyboard import Listener, Controller, Key, KeyCode
-import soundfile
-from dotenv import load_dotenv
 import sounddevice as sd
+# openai, soundfile, pyperclip, dotenv and tkinter are imported where they are used:
+# openai alone takes most of a second, and none of them is needed to start listening
 
-import tkinter as tk
 import threading
 
 # Only available on Windows by default:
@@ -59,6 +60,7 @@ def set_status(text):
 
 def init_ui():
     """Initialize the Tkinter UI if needed"""
+    import tkinter as tk
     global root, status_label
     
     try:
@@ -87,9 +89,15 @@ def init_ui():
         status_label = None
         return False
 
+def preload():
+    """Import the API client and the audio and clipboard helpers while the listener starts,
+    so the first recording doesn't pay for them."""
+    import openai, soundfile, pyperclip
+
 def main():
     try:
         # Load environment variables
+        from dotenv import load_dotenv
         load_dotenv()
         
         # Initialize UI (optional)
@@ -112,7 +120,6 @@ def main():
         print("Press right SHIFT while recording to translate to Dutch")
         print("Press ENTER while recording to get a ChatGPT response to your query")
         print("Press CTRL+C to exit")
-        print("Waiting for input...")
 
         # Key to hold down to start recording
         record_key = Key.ctrl_r
@@ -135,7 +142,7 @@ def main():
 
         # Read the API key from the file
         with open(api_key_path, 'r') as file:
-            openai.api_key = file.read().strip()
+            api_key = file.read().strip()
 
         # Callback function to collect audio data
         def callback(indata, frames, time, status):
@@ -210,13 +217,16 @@ def main():
                     print("Audio data is less than 1 second long.")
                     return
 
+                import openai, soundfile, pyperclip
+
                 # Write audio data to file
                 soundfile.write('output.flac', audio_data_np, 16000, format='flac')
               
                 # Save or send the audio data to OpenAI Whisper
                 with open("output.flac", "rb") as file:
                     print("Sending audio data to OpenAI Whisper...")
-                    client = openai.OpenAI(api_key=openai.api_key)
+                    # Don't let a hung request block the script forever (the client retries 429/5xx itself)
+                    client = openai.OpenAI(api_key=api_key, timeout=60.0)
                     transcript = client.audio.transcriptions.create(
                         model="whisper-1",
                         file=file,
@@ -234,7 +244,7 @@ def main():
                         translate = False
 
                         print("Translating transcript to Dutch...")
-                        result = openai.chat.completions.create(
+                        result = client.chat.completions.create(
                             model="gpt-4o-mini",
                             messages=[
                                 {"role": "system", "content": "You translate the input text to Dutch. You only output the translated text and nothing else. Avoid using the uw form as this is old fashioned"},
@@ -251,7 +261,7 @@ def main():
                         get_response = False
                         
                         print("Getting response from ChatGPT...")
-                        result = openai.chat.completions.create(
+                        result = client.chat.completions.create(
                             model="gpt-4o-mini",
                             messages=[
                                 {"role": "system", "content": "You are a helpful assistant. Respond directly to the user's query with useful information."},
@@ -282,8 +292,12 @@ def main():
                         # Since there are no accents, we can just use the standard type command.
                         keyboard.type(transcript_text)
               
+        # The API client is imported on the side, the listener doesn't need it
+        threading.Thread(target=preload, daemon=True).start()
+
         # Start listening for key events
         with Listener(on_press=on_press, on_release=on_release) as listener:
+            print(f"Waiting for input... (ready {time.perf_counter() - startup_time:.2f}s after startup)")
             listener.join()
             
     except FileNotFoundError:
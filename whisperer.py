@@ -9,16 +9,27 @@
 
 
 import sys, os
+import io, time, itertools, json, random
+
+# Startup profile: when each step finished, printed once the listener is running
+startup_time = time.perf_counter()
+startup_steps = []
+
 import sounddevice as sd
 import numpy as np
-import openai
-import pyperclip
 from pynput.keyboard import Listener, Controller, Key, KeyCode
-import soundfile
-from dotenv import load_dotenv
+# openai, soundfile, pyperclip, dotenv and tkinter are imported where they are
+# used: openai alone takes most of a second, and none of them is needed to start listening
 
-import tkinter as tk
 import threading
+import queue
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Characters that keyboard.type() can produce without the clipboard
+TYPEABLE_CHARS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 .,;:!?-\'_')
 
 # Only available on Windows by default:
 try:
@@ -28,92 +39,1506 @@ except ImportError:
 
 # Initialize global variables
 recording = False
-audio_data = []
+audio_data = None
 stream = None
 translate = False
 force_clipboard = False
 
-# We'll store references to our Tk objects here
+# Always-on capture engine (only used when WHISPERER_PERSISTENT_STREAM is enabled)
+capture = None
+capture_start = 0
+
+# Shared OpenAI client with a pooled, keep-alive HTTP transport
+api_key = None
+api_client = None
+api_client_lock = threading.Lock()
+last_api_activity = 0.0
+
+# Circuit breakers for the transcription and chat APIs (created in main())
+whisper_breaker = None
+chat_breaker = None
+
+# Recordings waiting for the API to come back (only used when WHISPERER_SPOOL is enabled)
+spool = None
+
+# Every transcript, searchable with --search (created in main() unless WHISPERER_HISTORY=0)
+history = None
+
+# Start and stop tones (created in main())
+earcons = None
+
+# Worker pool that processes recordings and types the results in order
+scheduler = None
+
+# Local Whisper model and the router that chooses between it and the API per clip
+local_model = None
+local_model_ready = threading.Event()
+local_model_lock = threading.Lock()
+local_queue_depth = 0
+# Guards local_queue_depth; local_model_lock is held for a whole transcription
+local_queue_lock = threading.Lock()
+router = None
+
+# Backup requests for slow transcriptions (only used when WHISPERER_HEDGE is enabled)
+hedger = None
+
+# Numbers the clips kept on disk when WHISPERER_KEEP_AUDIO is enabled
+clip_counter = itertools.count(1)
+
+# Streaming mode: segments are transcribed while the record key is still held
+segmenter = None
+segment_executor = None
+
+# The optional status window (see init_ui)
 root = None
-status_label = None
 
-def set_status(text):
-    """Update the Tkinter status label (thread-safe)."""
-    global root, status_label
-    
-    # If Tkinter is not initialized or there's no UI, just print to console
-    if root is None or status_label is None:
-        print(f"Status: {text}")
+def setting(name, default):
+    """Read a WHISPERER_<name> setting from the environment (or .env file), falling back to default."""
+    value = os.environ.get(f"WHISPERER_{name}")
+    if value is None or value == "":
+        return default
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    return value
+
+class Tracer:
+    """Writes one JSONL record per pipeline stage of every recording (WHISPERER_TRACE=1).
+
+    Records carry the job id, the stage name, its start time and duration in milliseconds,
+    plus any extra fields such as the clip length or the upload size. Writing happens on
+    a background thread, so tracing only costs a queue put on the hot path. When tracing
+    is off, span() is a no-op.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.ids = itertools.count(1)
+        self.local = threading.local()
+        self.records = queue.SimpleQueue()
+        # Turns perf_counter() readings into wall-clock timestamps
+        self.epoch = time.time() - time.perf_counter()
+        if path:
+            threading.Thread(target=self._write, name="whisperer-trace", daemon=True).start()
+
+    def new_job(self):
+        return next(self.ids)
+
+    @contextmanager
+    def job(self, job_id):
+        """Spans opened on this thread inside the block belong to job_id."""
+        previous = getattr(self.local, "job", None)
+        self.local.job = job_id
+        try:
+            yield
+        finally:
+            self.local.job = previous
+
+    def bind(self, work):
+        """Wrap work so spans it opens on another thread (an executor) belong to the current job."""
+        job_id = getattr(self.local, "job", None)
+        def run(*args):
+            with self.job(job_id):
+                return work(*args)
+        return run
+
+    def span(self, stage, job=None, **fields):
+        """Time a block; fields added to the yielded dict end up in the record."""
+        if not self.path:
+            return nullcontext(fields)
+        return self._span(stage, job, fields)
+
+    @contextmanager
+    def _span(self, stage, job, fields):
+        start = time.perf_counter()
+        try:
+            yield fields
+        finally:
+            self.record(stage, job, start, **fields)
+
+    def record(self, stage, job, start, **fields):
+        """Record a stage that began at perf_counter() value start and ends now."""
+        if self.path:
+            seconds = time.perf_counter() - start
+            if job is None:
+                job = getattr(self.local, "job", None)
+            self.records.put({"job": job, "stage": stage, "start": round(self.epoch + start, 6),
+                              "ms": round(seconds * 1000, 3), **fields})
+
+    def _write(self):
+        with open(self.path, "a", encoding="utf-8") as file:
+            while True:
+                file.write(json.dumps(self.records.get()) + "\n")
+                # Write everything that is waiting before flushing
+                while not self.records.empty():
+                    file.write(json.dumps(self.records.get()) + "\n")
+                file.flush()
+
+# Disabled until main() reads WHISPERER_TRACE
+tracer = Tracer()
+
+class CaptureBuffer:
+    """Holds one recording in a single growable NumPy array and hands out zero-copy views of it."""
+
+    def __init__(self, dtype=np.float32, seconds=600, samplerate=16000):
+        self.data = np.empty(int(samplerate * seconds), dtype=dtype)
+        self.frames_written = 0
+
+    def __len__(self):
+        return self.frames_written
+
+    def append(self, block):
+        count = len(block)
+        if self.frames_written + count > len(self.data):
+            # Double the capacity; the old array stays valid for anyone holding a view of it
+            grown = np.empty(max(2 * len(self.data), self.frames_written + count), dtype=self.data.dtype)
+            grown[:self.frames_written] = self.data[:self.frames_written]
+            self.data = grown
+        self.data[self.frames_written:self.frames_written + count] = block[:, 0]
+        # Update the length last, so readers never see frames that aren't written yet
+        self.frames_written += count
+
+    def read(self, start=0, end=None):
+        """Zero-copy (frames, 1) view of frames [start, end) of the recording."""
+        end = self.frames_written if end is None else end
+        return self.data[start:end].reshape(-1, 1)
+
+def as_float(audio_data_np):
+    """Float32 samples in -1..1, for level measurements on int16 or float32 recordings."""
+    if audio_data_np.dtype == np.int16:
+        return audio_data_np.astype(np.float32) / 32768
+    return audio_data_np
+
+class RingCapture:
+    """Keeps one InputStream open for the whole session and records into a fixed-size ring buffer."""
+
+    def __init__(self, samplerate=16000, seconds=300, dtype=np.float32):
+        self.samplerate = samplerate
+        self.buffer = np.zeros(int(samplerate * seconds), dtype=dtype)
+        # Total number of frames written since the stream was opened
+        self.frames_written = 0
+        self.stream = None
+
+    def callback(self, indata, frames, time, status):
+        # Runs on the PortAudio thread: copy into the preallocated buffer, never allocate.
+        if indata.shape[1] != 1:
+            return
+
+        samples = indata[:, 0]
+        capacity = len(self.buffer)
+        count = len(samples)
+        if count > capacity:
+            samples = samples[count - capacity:]
+
+        start = (self.frames_written + count - len(samples)) % capacity
+        first = min(len(samples), capacity - start)
+        self.buffer[start:start + first] = samples[:first]
+        if first < len(samples):
+            self.buffer[:len(samples) - first] = samples[first:]
+
+        self.frames_written += count
+
+    def start(self):
+        self.stream = sd.InputStream(callback=self.callback, channels=1, samplerate=self.samplerate, dtype=self.buffer.dtype.name)
+        self.stream.start()
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
+
+    def mark(self, preroll_ms=0):
+        """Return the frame offset a recording started now should begin at, including pre-roll."""
+        preroll_frames = int(self.samplerate * preroll_ms / 1000)
+        return max(0, self.frames_written - preroll_frames)
+
+    def read(self, start, end=None):
+        """Copy frames [start, end) out of the ring buffer as a (frames, 1) array."""
+        capacity = len(self.buffer)
+        if end is None:
+            end = self.frames_written
+
+        if start < end - capacity:
+            print("Recording is longer than the capture buffer, the oldest audio was dropped.")
+            start = end - capacity
+
+        count = max(0, end - start)
+        out = np.empty(count, dtype=self.buffer.dtype)
+        offset = start % capacity
+        first = min(count, capacity - offset)
+        out[:first] = self.buffer[offset:offset + first]
+        out[first:] = self.buffer[:count - first]
+        return out.reshape(-1, 1)
+
+def get_client():
+    """Return the process-wide OpenAI client, creating it (and its connection pool) on first use."""
+    global api_client
+    with api_client_lock:
+        if api_client is None:
+            import openai
+            # One pooled HTTP transport with keep-alive, shared by transcription and chat calls.
+            # The limits type comes from openai's own defaults, so this works with whichever
+            # transport package the installed openai version uses
+            http_client = openai.DefaultHttpxClient(
+                limits=type(openai.DEFAULT_CONNECTION_LIMITS)(
+                    max_connections=setting("MAX_CONNECTIONS", 8),
+                    max_keepalive_connections=setting("MAX_CONNECTIONS", 8),
+                    keepalive_expiry=setting("KEEPALIVE_SECONDS", 60.0),
+                ),
+                timeout=openai.Timeout(setting("TIMEOUT_SECONDS", 60.0), connect=setting("CONNECT_TIMEOUT_SECONDS", 5.0)),
+            )
+            # Retries are handled by call_api, which also knows about the circuit breakers
+            api_client = openai.OpenAI(api_key=api_key, http_client=http_client, max_retries=0)
+        return api_client
+
+def warm_connection():
+    """Open (or refresh) a pooled connection in the background, so the TLS handshake
+    overlaps with the user speaking instead of happening after the key is released."""
+    global last_api_activity
+    if not setting("PREWARM", True):
         return
-        
-    # Use `event_generate` for thread-safe UI updates
-    def update_label(evt):
-        status_label.config(text=text)
 
+    # A connection used recently is still in the keep-alive pool
+    now = time.monotonic()
+    if now - last_api_activity < setting("KEEPALIVE_SECONDS", 60.0) / 2:
+        return
+    last_api_activity = now
+
+    def _warm():
+        try:
+            get_client().with_options(max_retries=0, timeout=5.0).models.retrieve("whisper-1")
+        except Exception:
+            # Warming is only an optimisation, the real request will report any problem
+            pass
+
+    threading.Thread(target=_warm, daemon=True).start()
+
+class ApiUnavailable(Exception):
+    """Raised instead of calling an API whose circuit breaker is open."""
+
+class CircuitBreaker:
+    """Stops calling an API that keeps failing, so every clip doesn't wait for the same timeouts.
+
+    After `threshold` failed calls in a row the breaker opens and calls fail right away.
+    Once `reset_seconds` have passed, one trial call is let through: if it succeeds the
+    breaker closes again, if it fails the breaker stays open for another period.
+    """
+
+    def __init__(self, name, threshold=3, reset_seconds=30.0):
+        self.name = name
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.lock = threading.Lock()
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if not self.trial_running and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.trial_running = True
+                return True
+            return False
+
+    def is_open(self):
+        with self.lock:
+            return self.opened_at is not None
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                print(f"The {self.name} API is reachable again.")
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    print(f"The {self.name} API keeps failing, pausing calls for {self.reset_seconds:.0f}s.")
+                self.opened_at = time.monotonic()
+
+def retryable_errors():
+    """Errors worth another attempt: rate limits, server errors, timeouts and dropped connections."""
+    import openai
+    return (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+def call_api(breaker, request, timeout):
+    """Call request(timeout) with retries, a deadline and a circuit breaker.
+
+    Retryable errors are retried with jittered exponential backoff (or the server's
+    Retry-After) until WHISPERER_MAX_RETRIES or WHISPERER_DEADLINE_SECONDS runs out.
+    Each attempt gets at most `timeout` seconds.
+    """
+    if not breaker.allow():
+        raise ApiUnavailable(f"the {breaker.name} API is unavailable")
+
+    deadline = time.monotonic() + setting("DEADLINE_SECONDS", 60.0)
+    max_retries = setting("MAX_RETRIES", 3)
+    for attempt in itertools.count():
+        remaining = deadline - time.monotonic()
+        try:
+            result = request(min(timeout, max(remaining, 0.1)))
+        except retryable_errors() as e:
+            # Full jitter keeps parallel jobs from retrying in lockstep
+            delay = random.uniform(0, min(8.0, 0.5 * 2 ** attempt))
+            response = getattr(e, "response", None)
+            retry_after = response.headers.get("retry-after") if response is not None else None
+            if retry_after is not None:
+                try:
+                    delay = float(retry_after)
+                except ValueError:
+                    pass
+            if attempt >= max_retries or time.monotonic() + delay >= deadline:
+                breaker.record_failure()
+                raise
+            print(f"{breaker.name} API error ({type(e).__name__}), retrying in {delay:.1f}s...")
+            time.sleep(delay)
+        except Exception:
+            # The API answered, just not with a result (bad request, bad key): it is up
+            breaker.record_success()
+            raise
+        else:
+            breaker.record_success()
+            return result
+
+# Audio codecs Whisper accepts: file extension and soundfile format/subtype
+AUDIO_CODECS = {
+    "flac": ("flac", "FLAC", "PCM_16"),
+    "opus": ("ogg", "OGG", "OPUS"),
+    "wav": ("wav", "WAV", "PCM_16"),
+}
+
+def encode_clip(audio_data_np, codec):
+    """Encode a mono 16 kHz clip in memory with one of AUDIO_CODECS; returns (filename, bytes)."""
+    import soundfile
+    if codec not in AUDIO_CODECS:
+        raise ValueError(f"Unknown WHISPERER_CODEC '{codec}', use one of: {', '.join(AUDIO_CODECS)}")
+    extension, audio_format, subtype = AUDIO_CODECS[codec]
+    options = {}
+    if subtype == "OPUS":
+        # libsndfile maps compression_level 0..1 onto 256..6 kbit/s for Opus
+        kbps = setting("OPUS_KBPS", 24)
+        options["compression_level"] = min(1.0, max(0.0, 1 - (kbps * 1000 - 6000) / 250000))
+
+    buffer = io.BytesIO()
+    soundfile.write(buffer, audio_data_np, 16000, format=audio_format, subtype=subtype, **options)
+    return f"audio.{extension}", buffer.getvalue()
+
+def encode_audio(audio_data_np):
+    """Encode a clip in memory with the configured codec and return (filename, bytes)."""
+    with tracer.span("encode") as span:
+        name, data = encode_clip(audio_data_np, setting("CODEC", "flac"))
+        span["bytes"] = len(data)
+
+    # Optionally keep a copy of every uploaded clip for debugging
+    if setting("KEEP_AUDIO", False):
+        folder = setting("KEEP_AUDIO_DIR", "debug-audio")
+        os.makedirs(folder, exist_ok=True)
+        extension = os.path.splitext(name)[1]
+        filename = os.path.join(folder, f"clip-{time.strftime('%Y%m%d-%H%M%S')}-{next(clip_counter)}{extension}")
+        with open(filename, "wb") as file:
+            file.write(data)
+
+    return name, data
+
+def transcribe_audio(audio_data_np):
+    """Send a mono 16 kHz clip to OpenAI Whisper and return the raw transcript text."""
+    set_stage("Transcribing")
+    primary = router.transcribe if router is not None else transcribe_cloud
+    with tracer.span("transcribe", clip_seconds=round(len(audio_data_np) / 16000, 2)):
+        if hedger is not None:
+            text = hedger.transcribe(primary, audio_data_np)
+        else:
+            text = primary(audio_data_np)
+    return text
+
+def transcribe_cloud(audio_data_np):
+    """Transcribe a clip with the whisper-1 API."""
+    global last_api_activity
+
+    # Encode in memory, so concurrent jobs never share (or overwrite) a file on disk
+    name, data = encode_audio(audio_data_np)
+
+    print("Sending audio data to OpenAI Whisper...")
     try:
-        root.event_generate("<<StatusUpdate>>", when="tail")
-        root.bind("<<StatusUpdate>>", update_label, add="+")
-    except Exception as e:
-        print(f"UI update error: {str(e)}")
+        with tracer.span("upload", bytes=len(data)):
+            transcript = call_api(whisper_breaker, lambda timeout: get_client().audio.transcriptions.create(
+                model="whisper-1",
+                file=(name, data),
+                timeout=timeout,
+            ), setting("TRANSCRIBE_TIMEOUT_SECONDS", 30.0))
+    except (ApiUnavailable,) + retryable_errors() as e:
+        if local_model is None:
+            raise
+        print(f"Whisper API failed ({str(e)}), transcribing locally instead...")
+        return transcribe_locally(audio_data_np)
+    last_api_activity = time.monotonic()
+    return transcript.text
 
-def play_tone(frequency=800, duration=0.1, volume=0.3):
-    """Play a synthesized tone in a background thread to avoid blocking."""
-    def _play():
+def load_local_model():
+    """Load the local Whisper model (same backends and settings as whisperer-local.py) in the background."""
+    def _load():
+        global local_model
         try:
-            sample_rate = 44100
-            t = np.linspace(0, duration, int(sample_rate * duration), False)
-            # Generate a sine wave
-            tone = np.sin(frequency * t * 2 * np.pi)
-            # Apply volume
-            tone = tone * volume
-            # Play the tone
-            sd.play(tone, sample_rate)
-            sd.wait()
+            backend = setting("LOCAL_BACKEND", "whisper")
+            if backend == "faster-whisper":
+                from faster_whisper import WhisperModel
+                local_model = WhisperModel(
+                    setting("LOCAL_MODEL", "small.en"),
+                    device="cpu",
+                    compute_type=setting("LOCAL_COMPUTE_TYPE", "int8"),
+                    # 0 would mean CTranslate2's default of 4 threads, not all cores
+                    cpu_threads=setting("LOCAL_THREADS", 0) or os.cpu_count(),
+                )
+            else:
+                import whisper
+                local_model = whisper.load_model(setting("LOCAL_MODEL", "small.en"))
+
+            # Warm up so the first routed clip isn't slow
+            transcribe_locally(np.zeros((16000, 1), dtype=np.float32))
+            print("Local Whisper model ready.")
         except Exception as e:
-            # Silently ignore audio playback errors
+            local_model = None
+            print(f"Local Whisper model not available, using the API only: {str(e)}")
+        finally:
+            local_model_ready.set()
+
+    threading.Thread(target=_load, daemon=True).start()
+
+def transcribe_locally(audio_data_np):
+    """Transcribe a clip with the local model. Only one clip runs at a time; others wait their turn."""
+    global local_queue_depth
+    samples = as_float(audio_data_np)[:, 0].astype(np.float32)
+
+    # Updated from scheduler, hedge and segment threads at once
+    with local_queue_lock:
+        local_queue_depth += 1
+    try:
+        with local_model_lock:
+            if setting("LOCAL_BACKEND", "whisper") == "faster-whisper":
+                segments, info = local_model.transcribe(samples, beam_size=setting("LOCAL_BEAM_SIZE", 1))
+                text = "".join(segment.text for segment in segments)
+            else:
+                text = local_model.transcribe(samples, fp16=False)["text"]
+    finally:
+        with local_queue_lock:
+            local_queue_depth -= 1
+    return text.strip()
+
+class TranscriptionRouter:
+    """Picks the local model or the whisper-1 API for every clip, whichever should answer first.
+
+    Short clips are dominated by the network round trip, long ones by local CPU time. For
+    each backend the router keeps the latencies of recent clips and fits a straight line
+    (fixed overhead + seconds per second of audio). The local prediction also counts the
+    clips already waiting for the local model. Every decision and its outcome is appended
+    to a JSONL log, so the thresholds can be tuned from real data.
+    """
+
+    # Starting guesses (overhead seconds, seconds per audio second) until there is data
+    PRIORS = {"cloud": (1.0, 0.05), "local": (0.3, 0.5)}
+
+    def __init__(self, log_path, explore=0.05):
+        self.history = {"cloud": deque(maxlen=50), "local": deque(maxlen=50)}
+        self.lock = threading.Lock()
+        self.log_path = log_path
+        self.explore = explore
+
+    def predict(self, backend, duration):
+        with self.lock:
+            points = list(self.history[backend])
+        overhead, rate = self.PRIORS[backend]
+        durations = [point[0] for point in points]
+        if len(points) >= 3 and max(durations) - min(durations) > 1.0:
+            rate, overhead = np.polyfit(durations, [point[1] for point in points], 1)
+            overhead, rate = max(0.0, overhead), max(0.0, rate)
+        elif points:
+            # Not enough spread to fit a line: keep the prior rate, shift the overhead to match
+            overhead = max(0.0, np.mean([latency - rate * seconds for seconds, latency in points]))
+        return overhead + rate * duration
+
+    def transcribe(self, audio_data_np):
+        duration = len(audio_data_np) / 16000
+        queue_depth = local_queue_depth
+        predicted_cloud = self.predict("cloud", duration)
+        predicted_local = self.predict("local", duration) * (1 + queue_depth)
+
+        if not local_model_ready.is_set() or local_model is None:
+            choice, reason = "cloud", "local model not ready"
+        elif whisper_breaker.is_open():
+            choice, reason = "local", "API unavailable"
+        elif random.random() < self.explore:
+            # Now and then try the other backend, so its latency estimate stays current
+            choice = "local" if predicted_cloud <= predicted_local else "cloud"
+            reason = "explore"
+        else:
+            choice = "local" if predicted_local < predicted_cloud else "cloud"
+            reason = "faster"
+
+        print(f"Routing {duration:.1f}s clip to {choice} (predicted cloud {predicted_cloud:.2f}s, local {predicted_local:.2f}s)")
+        start = time.monotonic()
+        error = None
+        try:
+            if choice == "local":
+                return transcribe_locally(audio_data_np)
+            return transcribe_cloud(audio_data_np)
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            latency = time.monotonic() - start
+            if error is None:
+                with self.lock:
+                    self.history[choice].append((duration, latency))
+            self._log({
+                "time": time.time(),
+                "duration": round(duration, 3),
+                "choice": choice,
+                "reason": reason,
+                "local_queue_depth": queue_depth,
+                "predicted_cloud": round(predicted_cloud, 3),
+                "predicted_local": round(predicted_local, 3),
+                "latency": round(latency, 3),
+                "error": error,
+            })
+
+    def _log(self, record):
+        try:
+            with self.lock, open(self.log_path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(record) + "\n")
+        except OSError as e:
+            print(f"Could not write routing log: {str(e)}")
+
+class Hedger:
+    """Sends a second, backup transcription request when the first one is slow, and uses
+    whichever answers first.
+
+    The deadline is the 95th percentile of recent request latencies, so only the slowest
+    few percent of clips are hedged. The backup goes to the local model when it is loaded
+    and idle, otherwise it is a second API request. A backup that hasn't started yet is
+    cancelled; one already in flight can't be interrupted, so its result is discarded.
+    """
+
+    def __init__(self, min_delay=1.0, default_delay=3.0, workers=4):
+        self.latencies = deque(maxlen=100)
+        self.min_delay = min_delay
+        self.default_delay = default_delay
+        # workers is how many transcriptions can run at once (scheduler, streaming and spool
+        # threads); backups get a pool of their own so they never queue behind primaries
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hedge")
+        self.backup_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="hedge-backup")
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.saved = 0.0
+
+    def deadline(self):
+        with self.lock:
+            latencies = list(self.latencies)
+        if len(latencies) < 10:
+            return self.default_delay
+        return max(self.min_delay, float(np.percentile(latencies, 95)))
+
+    def transcribe(self, primary, audio_data_np):
+        """Run primary(audio) and hedge it if it misses the deadline. Returns the transcript."""
+        start = time.monotonic()
+        delay = self.deadline()
+        first = self.executor.submit(tracer.bind(primary), audio_data_np)
+        with self.lock:
+            self.requests += 1
+
+        done, _ = wait([first], timeout=delay)
+        if done:
+            # Fast failures (a bad request, an open breaker) would drag the deadline down
+            if first.exception() is None:
+                self._record(time.monotonic() - start)
+            return first.result()
+
+        if local_model is not None and local_queue_depth == 0:
+            backend, backup_work = "local model", transcribe_locally
+        else:
+            backend, backup_work = "API", transcribe_cloud
+        print(f"No transcript after {delay:.1f}s, sending a backup request to the {backend}...")
+        backup = self.backup_executor.submit(tracer.bind(backup_work), audio_data_np)
+        with self.lock:
+            self.hedged += 1
+
+        pending = {first, backup}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None and pending:
+                    # One request failed: wait for the other one instead
+                    continue
+                loser = backup if future is first else first
+                loser.cancel()
+                if future is first:
+                    if future.exception() is None:
+                        self._record(time.monotonic() - start)
+                else:
+                    with self.lock:
+                        self.hedge_wins += 1
+                    # The time saved is only known once the original request finishes
+                    won_at = time.monotonic()
+                    first.add_done_callback(lambda f: self._record_saved(start, won_at, f))
+                return future.result()
+
+    def _record(self, latency):
+        with self.lock:
+            self.latencies.append(latency)
+
+    def _record_saved(self, start, won_at, future):
+        finished = time.monotonic()
+        with self.lock:
+            if not future.cancelled() and future.exception() is None:
+                # Keep slow requests in the percentile, or the deadline would drift down
+                self.latencies.append(finished - start)
+                self.saved += finished - won_at
+
+    def stats(self):
+        """Share of requests that were hedged, how often the backup won and the time saved."""
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "hedge_rate": self.hedged / self.requests if self.requests else 0.0,
+                "hedge_wins": self.hedge_wins,
+                "saved_seconds": self.saved,
+            }
+
+class Spool:
+    """Keeps recordings that couldn't be transcribed on disk and replays them once the API is back.
+
+    Each recording is one file: a JSON header line (time, duration, translate flag)
+    followed by the clip as 16-bit FLAC. Files are written to a temporary name, flushed
+    to disk and then renamed, so a crash never leaves a half-written recording behind.
+    A background thread replays them oldest first. The results go to a history log (and
+    the clipboard), since the window the text was meant for is long gone. When the spool
+    grows past its size caps the oldest recordings are dropped.
+    """
+
+    def __init__(self, folder, max_bytes, max_files, history_path, use_clipboard=True):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.history_path = history_path
+        self.use_clipboard = use_clipboard
+        self.lock = threading.Lock()
+        self.wake_event = threading.Event()
+        # Transcripts of replays that failed after Whisper answered, so they aren't paid for twice
+        self.transcribed = {}
+        os.makedirs(folder, exist_ok=True)
+
+        # Leftovers of writes that were interrupted by a crash
+        for name in os.listdir(folder):
+            if name.endswith(".tmp"):
+                os.remove(os.path.join(folder, name))
+
+        threading.Thread(target=self._drain, name="whisperer-spool", daemon=True).start()
+
+    def pending(self):
+        """Spooled recordings, oldest first (the file names start with a timestamp)."""
+        return sorted(name for name in os.listdir(self.folder) if name.endswith(".spool"))
+
+    def add(self, audio_data_np, should_translate):
+        header = {"time": time.time(), "duration": len(audio_data_np) / 16000, "translate": should_translate}
+        name, data = encode_clip(audio_data_np, "flac")
+        path = os.path.join(self.folder, f"{time.time_ns()}.spool")
+        with self.lock:
+            with open(path + ".tmp", "wb") as file:
+                file.write(json.dumps(header).encode("utf-8") + b"\n")
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(path + ".tmp", path)
+            self._enforce_caps()
+        print(f"Saved the recording to the spool, {len(self.pending())} waiting to be transcribed.")
+
+    def _enforce_caps(self):
+        names = self.pending()
+        sizes = [os.path.getsize(os.path.join(self.folder, name)) for name in names]
+        while names and (len(names) > self.max_files or sum(sizes) > self.max_bytes):
+            print(f"Spool is full, dropping the oldest recording {names[0]}.")
+            os.remove(os.path.join(self.folder, names.pop(0)))
+            sizes.pop(0)
+
+    def wake(self):
+        """Try the spooled recordings now, for example because a request just succeeded."""
+        self.wake_event.set()
+
+    def _drain(self):
+        delay = setting("SPOOL_RETRY_SECONDS", 15.0)
+        while True:
+            self.wake_event.wait(delay)
+            self.wake_event.clear()
+            # An open breaker is left to call_api: it lets a trial request through once the
+            # reset period is over, so the spool can find out by itself that the API is back
+            while self.pending():
+                name = self.pending()[0]
+                try:
+                    self._replay(name)
+                except (ApiUnavailable, OSError) + retryable_errors() as e:
+                    # Still offline, or a file is locked or the disk is full: try again later,
+                    # waiting longer every time
+                    print(f"Spooled recordings can't be sent yet: {str(e)}")
+                    delay = min(delay * 2, 300.0)
+                    break
+                except Exception as e:
+                    # Retrying won't help (the clip was rejected, say), don't let it block the rest
+                    print(f"Spooled recording {name} failed: {str(e)}")
+                    if not self._set_aside(name):
+                        delay = min(delay * 2, 300.0)
+                        break
+            else:
+                delay = setting("SPOOL_RETRY_SECONDS", 15.0)
+
+    def _replay(self, name):
+        import soundfile, pyperclip
+        path = os.path.join(self.folder, name)
+        # A damaged file raises ValueError or RuntimeError and is set aside by the drainer;
+        # an OSError (a file locked by a virus scanner, say) is retried later
+        with open(path, "rb") as file:
+            header = json.loads(file.readline())
+            audio_data_np, samplerate = soundfile.read(io.BytesIO(file.read()), dtype="float32", always_2d=True)
+
+        recorded = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(header["time"]))
+        if name not in self.transcribed:
+            print(f"Replaying the recording from {recorded}...")
+            started = time.perf_counter()
+            raw_text = transcribe_audio(audio_data_np)
+            self.transcribed[name] = (raw_text, post_process(raw_text, header["translate"]), time.perf_counter() - started)
+        raw_text, text, seconds = self.transcribed[name]
+
+        # Log first and delete last: a crash in between replays the recording, it is never lost
+        with open(self.history_path, "a", encoding="utf-8") as file:
+            file.write(f"[{recorded}] {text}\n")
+        if self.use_clipboard:
+            try:
+                pyperclip.copy(text)
+                print("Copied the replayed transcript to the clipboard.")
+            except pyperclip.PyperclipException as e:
+                # The text is in the history log, that will have to do
+                print(f"Could not copy the replayed transcript to the clipboard: {str(e)}")
+        if history is not None:
+            history.add(raw_text, text, "translate" if header["translate"] else "transcribe",
+                        header["duration"], seconds, header["time"])
+        os.remove(path)
+        del self.transcribed[name]
+
+    def _set_aside(self, name):
+        """Rename a recording to .bad so the drainer skips it; the audio stays on disk."""
+        path = os.path.join(self.folder, name)
+        try:
+            os.replace(path, path + ".bad")
+            print(f"Set {name} aside as {name}.bad.")
+            return True
+        except OSError as e:
+            print(f"Could not set {name} aside: {str(e)}")
+            return False
+
+class History:
+    """Searchable history of every transcription in an SQLite file (WHISPERER_HISTORY_PATH).
+
+    Each job stores the raw transcript, the mode, the final output, the clip length and
+    how long it took to produce the output. An FTS5 index over the transcript and the
+    output makes searches fast even with hundreds of thousands of entries. add() only
+    queues the record; a background thread writes whatever has gathered in one
+    transaction at most every flush_seconds, so saving never delays typing the text.
+    """
+
+    def __init__(self, path, flush_seconds=2.0, batch_size=100):
+        self.path = path
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.records = queue.SimpleQueue()
+        self.db = open_history(path)
+        self.thread = threading.Thread(target=self._write, name="whisperer-history", daemon=True)
+        self.thread.start()
+
+    def add(self, raw, output, mode, clip_seconds=None, latency_seconds=None, created=None):
+        latency_ms = None if latency_seconds is None else round(latency_seconds * 1000, 1)
+        self.records.put((created or time.time(), mode, raw, output, clip_seconds, latency_ms))
+
+    def close(self):
+        """Write the records that are still waiting, for example on exit."""
+        self.records.put(None)
+        self.thread.join(5)
+
+    def _write(self):
+        while True:
+            batch = [self.records.get()]
+            # Gather more records for one transaction, until the batch is full or it's time to flush
+            deadline = time.monotonic() + self.flush_seconds
+            while batch[-1] is not None and len(batch) < self.batch_size:
+                try:
+                    batch.append(self.records.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            rows = [record for record in batch if record is not None]
+            try:
+                with self.db:
+                    self.db.executemany(
+                        "INSERT INTO history (created, mode, raw, output, clip_seconds, latency_ms) VALUES (?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+            except sqlite3.Error as e:
+                print(f"Could not save {len(rows)} transcripts to the history: {str(e)}")
+            if batch[-1] is None:
+                self.db.close()
+                return
+
+def open_history(path):
+    """Open (and if needed create) the history database with its full-text index."""
+    db = sqlite3.connect(path, check_same_thread=False)
+    # Lets searches read while the app is writing
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript("""
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY, created REAL, mode TEXT, raw TEXT, output TEXT,
+            clip_seconds REAL, latency_ms REAL);
+        CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5(
+            raw, output, content='history', content_rowid='id', tokenize='unicode61 remove_diacritics 2');
+        CREATE TRIGGER IF NOT EXISTS history_insert AFTER INSERT ON history BEGIN
+            INSERT INTO history_fts (rowid, raw, output) VALUES (new.id, new.raw, new.output);
+        END;
+        CREATE TRIGGER IF NOT EXISTS history_delete AFTER DELETE ON history BEGIN
+            INSERT INTO history_fts (history_fts, rowid, raw, output) VALUES ('delete', old.id, old.raw, old.output);
+        END;
+    """)
+    return db
+
+def post_process(transcript_text, should_translate):
+    """Apply the text clean-up and the optional translation to a raw transcript."""
+    import openai
+    global last_api_activity
+
+    # Replace "New paragraph." with "\n"
+    transcript_text = transcript_text.replace("New paragraph.", "\n\n")
+
+    print("Transcript:")
+    print(transcript_text)
+
+    if should_translate:
+        print("Translating transcript to Dutch...")
+        set_stage("Translating")
+        try:
+            with tracer.span("translate", chars=len(transcript_text)):
+                result = call_api(chat_breaker, lambda timeout: get_client().chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": "You translate the input text to Dutch. You only output the translated text and nothing else. Avoid using the uw form as this is old fashioned"},
+                        {"role": "user", "content": transcript_text},
+                    ],
+                    timeout=timeout,
+                ), setting("CHAT_TIMEOUT_SECONDS", 20.0))
+        except (ApiUnavailable, openai.APIError) as e:
+            # Better the untranslated text than nothing at all
+            print(f"Skipping translation, the chat API failed: {str(e)}")
+            return transcript_text
+        last_api_activity = time.monotonic()
+
+        transcript_text = result.choices[0].message.content
+        print(transcript_text)
+
+    return transcript_text
+
+class TextInjector:
+    """Puts text into the active window the fastest way that works.
+
+    Text with characters keyboard.type() can't produce is always pasted. Other text is
+    typed while that is expected to take less than WHISPERER_INJECT_MAX_TYPE_SECONDS,
+    judged by the typing speed measured so far, and pasted when it would take longer.
+    Longer typed text goes in chunks, and switches to pasting the rest if typing turns
+    out slower than expected. The user's clipboard is saved before the first paste and
+    restored by finish(), unless the clipboard was asked for explicitly.
+    """
+
+    def __init__(self, keyboard_controller, max_type_seconds=1.0, chunk_chars=32, restore_clipboard=True):
+        self.keyboard = keyboard_controller
+        self.max_type_seconds = max_type_seconds
+        self.chunk_chars = chunk_chars
+        self.restore_clipboard = restore_clipboard
+        # Running estimates, updated after every injection
+        self.type_rate = 100.0
+        self.paste_seconds = 0.1
+        self.saved_clipboard = None
+        self.keep_clipboard = False
+        self.last_pasted = None
+        self.totals = {}
+
+    def inject(self, text, use_clipboard=False):
+        """Type or paste text; returns the method used ("type", "chunks" or "paste")."""
+        start = time.perf_counter()
+        if use_clipboard or not TYPEABLE_CHARS.issuperset(text):
+            if not use_clipboard:
+                print("Special characters detected: " + str(set(text) - TYPEABLE_CHARS))
+            self.keep_clipboard = self.keep_clipboard or use_clipboard
+            method = "paste"
+            self._paste(text)
+        elif len(text) <= self.chunk_chars:
+            method = "type"
+            self._type(text)
+        elif len(text) / self.type_rate > self.max_type_seconds:
+            method = "paste"
+            self._paste(text)
+        else:
+            method = "chunks"
+            deadline = start + self.max_type_seconds
+            for offset in range(0, len(text), self.chunk_chars):
+                rest = text[offset:]
+                if time.perf_counter() + len(rest) / self.type_rate > deadline + self.paste_seconds:
+                    self._paste(rest)
+                    break
+                self._type(rest[:self.chunk_chars])
+
+        elapsed = time.perf_counter() - start
+        chars, seconds = self.totals.get(method, (0, 0.0))
+        self.totals[method] = (chars + len(text), seconds + elapsed)
+        print(f"Injected {len(text)} characters ({method}) in {elapsed * 1000:.0f} ms, "
+              f"{len(text) / max(elapsed, 1e-6):.0f} chars/s.")
+        return method
+
+    def _type(self, text):
+        start = time.perf_counter()
+        self.keyboard.type(text)
+        elapsed = time.perf_counter() - start
+        if elapsed > 0:
+            self.type_rate = 0.7 * self.type_rate + 0.3 * (len(text) / elapsed)
+
+    def _paste(self, text):
+        import pyperclip
+        start = time.perf_counter()
+        if self.restore_clipboard and self.saved_clipboard is None:
+            try:
+                self.saved_clipboard = pyperclip.paste()
+            except pyperclip.PyperclipException:
+                self.saved_clipboard = None
+
+        # Copy the text to the clipboard
+        pyperclip.copy(text)
+        self.last_pasted = text
+
+        # Simulate CTRL-V to paste the text
+        self.keyboard.press(Key.ctrl)
+        self.keyboard.press('v')
+        self.keyboard.release('v')
+        self.keyboard.release(Key.ctrl)
+        self.paste_seconds = 0.7 * self.paste_seconds + 0.3 * (time.perf_counter() - start)
+
+    def finish(self):
+        """Put the user's clipboard back after the pastes of one job."""
+        import pyperclip
+        saved, self.saved_clipboard = self.saved_clipboard, None
+        keep, self.keep_clipboard = self.keep_clipboard, False
+        if saved is None or keep:
+            return
+        # The target window reads the clipboard asynchronously after CTRL-V
+        time.sleep(0.1)
+        try:
+            # Leave it alone if something else was copied in the meantime
+            if pyperclip.paste() == self.last_pasted:
+                pyperclip.copy(saved)
+        except pyperclip.PyperclipException:
             pass
-    
-    # Play in a background thread to avoid blocking
-    threading.Thread(target=_play, daemon=True).start()
+
+    def stats(self):
+        """Characters per second for each injection method so far."""
+        return {method: chars / seconds if seconds else 0.0 for method, (chars, seconds) in self.totals.items()}
+
+def inject_text(transcript_text, injector, use_clipboard=False):
+    """Type the text into the active window, or paste it when it can't be typed."""
+    injector.inject(transcript_text, use_clipboard)
+    injector.finish()
+
+def claim_clipboard(clip_seconds):
+    """Decide on key release whether a recording is pasted from the clipboard.
+
+    A tap shorter than 0.5 s asks for the clipboard for the next recording that is long
+    enough to be sent. Deciding here, in recording order, keeps a recording that is
+    still being processed from taking the flag meant for a later one.
+    """
+    global force_clipboard
+    if clip_seconds < 0.5:
+        force_clipboard = True
+        return False
+    if clip_seconds < 1:
+        return False
+    use_clipboard, force_clipboard = force_clipboard, False
+    return use_clipboard
+
+def process_audio(audio_data_np, should_translate):
+    """Turn one recording into the text to type. Runs on a worker thread of the job scheduler."""
+    started = time.perf_counter()
+    try:
+        if len(audio_data_np) == 0:
+            print("No audio data recorded.")
+            return None
+
+        # Get length of audio data in seconds
+        audio_data_length = len(audio_data_np) / 16000
+
+        if audio_data_length < 1:
+            print("Audio data is less than 1 second long.")
+            return None
+
+        # Don't upload silence: trim it, and skip the API call if nobody spoke
+        if setting("VAD", True):
+            with tracer.span("vad", clip_seconds=round(audio_data_length, 2)):
+                trimmed = trim_silence(audio_data_np)
+            if trimmed is None:
+                print("No speech detected, not sending the recording.")
+                return None
+            saved = len(audio_data_np) - len(trimmed)
+            print(f"Trimmed {saved / 16000:.1f}s of silence ({saved * 2 // 1024} KB of 16-bit audio) before upload.")
+            audio_data_np = trimmed
+
+        try:
+            transcript_text = transcribe_audio(audio_data_np)
+        except (ApiUnavailable,) + retryable_errors():
+            if spool is None:
+                raise
+            # Don't lose the recording: it is transcribed once the API is reachable again
+            print("Could not reach OpenAI Whisper, keeping the recording for later.")
+            spool.add(audio_data_np, should_translate)
+            return None
+        if spool is not None:
+            spool.wake()
+        text = post_process(transcript_text, should_translate)
+        if history is not None:
+            history.add(transcript_text, text, "translate" if should_translate else "transcribe",
+                        round(audio_data_length, 2), time.perf_counter() - started)
+        return text
+    except Exception as e:
+        print(f"Error processing audio: {str(e)}")
+        return None
+
+def trim_silence(audio_data_np):
+    """Voice activity detection on a mono 16 kHz clip.
+
+    Trims silence at both ends, shortens long pauses in the middle and returns None when
+    nobody spoke at all. Works on 30 ms frames: a frame is speech when its energy is well
+    above the clip's noise floor, or moderately above it with a high zero-crossing rate
+    (quiet fricatives like "s" and "f"), or loud in absolute terms. The last rule keeps
+    clips without any pause, whose noise floor is the speech itself.
+    """
+    frame = 480
+    frames = len(audio_data_np) // frame
+    if frames == 0:
+        return None
+    samples = audio_data_np[:frames * frame, 0].reshape(frames, frame)
+    levels = as_float(samples)
+
+    energy = np.sqrt(np.mean(np.square(levels), axis=1))
+    crossings = np.mean(np.abs(np.diff(np.signbit(levels), axis=1)), axis=1)
+    noise_floor = np.percentile(energy, 10)
+    min_rms = setting("VAD_MIN_RMS", 0.002)
+    threshold = max(min_rms, noise_floor * 3)
+    speech = (energy > threshold) | ((energy > threshold / 2) & (crossings > 0.3)) | (energy > min_rms * 10)
+
+    if np.count_nonzero(speech) * frame < 16000 * setting("VAD_MIN_SPEECH_MS", 200) / 1000:
+        return None
+
+    # Keep some padding around speech so word onsets and endings aren't cut
+    pad = max(1, int(setting("VAD_PAD_MS", 200) / 30))
+    kernel = np.ones(2 * pad + 1, dtype=bool)
+    keep = np.convolve(speech, kernel, mode="same") > 0
+
+    # Collapse pauses longer than the limit to the limit
+    max_pause = max(2, int(setting("VAD_MAX_PAUSE_MS", 1000) / 30))
+    edges = np.diff(np.concatenate([[1], keep.astype(np.int8), [1]]))
+    starts = np.nonzero(edges == -1)[0]
+    ends = np.nonzero(edges == 1)[0]
+    for start, end in zip(starts, ends):
+        if start == 0 or end == frames:
+            # Leading and trailing silence is dropped completely
+            continue
+        if end - start > max_pause:
+            keep[start:end] = True
+            keep[start + max_pause // 2:end - max_pause // 2] = False
+        else:
+            keep[start:end] = True
+
+    return samples[keep].reshape(-1, 1)
+
+class JobScheduler:
+    """Runs recordings on a fixed pool of workers and types the results strictly in recording order.
+
+    Every accepted recording gets a sequence number. Workers may finish out of order (a short
+    clip often beats a long one), so finished results wait in a small reorder buffer until all
+    earlier recordings have been delivered. The queue is bounded so a burst of recordings
+    can't pile up unlimited work.
+    """
+
+    def __init__(self, workers=2, max_pending=8):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.lock = threading.Condition()
+        self.next_sequence = 1
+        self.next_delivery = 1
+        self.results = {}
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+        for _ in range(workers):
+            threading.Thread(target=self._work, daemon=True).start()
+        threading.Thread(target=self._deliver, daemon=True).start()
+
+    def submit(self, work, deliver):
+        """Queue work() to run on a worker; deliver(result) is called in submission order.
+        Returns the job's sequence number, or None when the queue is full."""
+        with self.lock:
+            try:
+                self.queue.put_nowait((self.next_sequence, time.monotonic(), work, deliver))
+            except queue.Full:
+                print("Too many recordings waiting to be processed, this one was dropped.")
+                return None
+            self.next_sequence += 1
+            return self.next_sequence - 1
+
+    def _work(self):
+        while True:
+            sequence, submitted, work, deliver = self.queue.get()
+            waited = time.monotonic() - submitted
+            try:
+                result = work()
+            except Exception as e:
+                print(f"Error processing audio: {str(e)}")
+                result = None
+
+            with self.lock:
+                self.results[sequence] = (deliver, result)
+                self.completed += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+                self.lock.notify_all()
+
+    def _deliver(self):
+        while True:
+            with self.lock:
+                while self.next_delivery not in self.results:
+                    self.lock.wait()
+                deliver, result = self.results.pop(self.next_delivery)
+                self.next_delivery += 1
+
+            if result is None:
+                continue
+            try:
+                deliver(result)
+            except Exception as e:
+                print(f"Error typing the transcript: {str(e)}")
+
+    def stats(self):
+        """Queue depth and queue wait time, for status output."""
+        with self.lock:
+            return {
+                "queued": self.queue.qsize(),
+                "in_flight": self.next_sequence - 1 - self.completed - self.queue.qsize(),
+                "waiting_for_order": len(self.results),
+                "completed": self.completed,
+                "avg_wait_ms": 1000 * self.total_wait / self.completed if self.completed else 0.0,
+                "max_wait_ms": 1000 * self.max_wait,
+            }
+
+class LiveSegmenter:
+    """Cuts a recording at pauses while the record key is still held and transcribes each
+    finished segment in the background, so only the last few seconds are left after release."""
+
+    def __init__(self, source, position, executor, job_id=None):
+        # source is the RingCapture or the CaptureBuffer the audio callback writes to
+        self.source = source
+        self.start = position
+        self.position = position
+        self.executor = executor
+        # The recording's trace job; segments are transcribed before the key is released
+        self.job_id = job_id
+        self.pending = source.read(position, position)
+        self.futures = []
+        self.window = 480  # 30 ms analysis windows
+        self.min_frames = int(16000 * setting("SEGMENT_MIN_SECONDS", 5.0))
+        self.max_frames = int(16000 * setting("SEGMENT_MAX_SECONDS", 25.0))
+        self.silence_windows = max(1, int(setting("SEGMENT_SILENCE_MS", 400) / 30))
+        self.silence_rms = setting("SILENCE_RMS", 0.01)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while not self.stop_event.wait(0.25):
+            try:
+                self._poll()
+            except Exception as e:
+                print(f"Error while segmenting audio: {str(e)}")
+
+    def _read_new(self, end=None):
+        end = self.source.frames_written if end is None else end
+        new = self.source.read(self.position, end)
+        self.position = end
+        return new
+
+    def _poll(self, end=None):
+        new = self._read_new(end)
+        if len(new) > 0:
+            self.pending = np.concatenate([self.pending, new], axis=0)
+
+        cut = self._find_cut()
+        while cut is not None:
+            segment = self.pending[:cut]
+            self.pending = self.pending[cut:]
+            if setting("VAD", True):
+                segment = trim_silence(segment)
+            if segment is not None:
+                print(f"Submitting {len(segment) / 16000:.1f}s segment while recording continues...")
+                self.futures.append(self.executor.submit(self._transcribe, segment))
+            cut = self._find_cut()
+
+    def _transcribe(self, segment):
+        with tracer.job(self.job_id):
+            return transcribe_audio(segment)
+
+    def _find_cut(self):
+        """Return the frame index to cut the pending audio at, or None to keep listening."""
+        if len(self.pending) < self.min_frames:
+            return None
+
+        # Per-window RMS energy of everything pending
+        windows = len(self.pending) // self.window
+        frames = as_float(self.pending[:windows * self.window, 0]).reshape(windows, self.window)
+        energy = np.sqrt(np.mean(np.square(frames), axis=1))
+        quiet = (energy < self.silence_rms).astype(np.int32)
+
+        # A window ends a usable pause if the last silence_windows windows were all quiet
+        runs = np.cumsum(np.concatenate([[0], quiet]))
+        k = self.silence_windows
+        ends = np.nonzero(runs[k:] - runs[:-k] == k)[0] + k
+        # Cut in the middle of the pause, never before the minimum segment length
+        cuts = (ends - k // 2) * self.window
+        cuts = cuts[(cuts >= self.min_frames) & (cuts <= self.max_frames)]
+        if len(cuts) > 0:
+            return int(cuts[-1])
+
+        if len(self.pending) >= self.max_frames:
+            # No pause found: cut at the quietest window within the allowed range
+            first = self.min_frames // self.window
+            last = self.max_frames // self.window
+            return int((first + np.argmin(energy[first:last])) * self.window)
+
+        return None
+
+    def finish(self, end=None):
+        """Stop segmenting and return the futures of submitted segments plus the remaining audio."""
+        self.stop_event.set()
+        self.thread.join()
+        self._poll(end)
+        return self.futures, self.pending
+
+def finish_streaming(segmenter, end, should_translate):
+    """Wait for the background segments, transcribe the tail and return the stitched text."""
+    started = time.perf_counter()
+    try:
+        futures, tail = segmenter.finish(end)
+
+        # Nothing was cut while recording: treat it as a normal clip
+        if not futures:
+            return process_audio(tail, should_translate)
+
+        try:
+            with tracer.span("segments", count=len(futures)):
+                texts = [future.result() for future in futures]
+
+            # Only the last few seconds still need to be processed after release
+            if setting("VAD", True):
+                tail = trim_silence(tail)
+                if tail is not None:
+                    texts.append(transcribe_audio(tail))
+            else:
+                tail_rms = np.sqrt(np.mean(np.square(as_float(tail)))) if len(tail) > 0 else 0.0
+                if len(tail) >= 16000 * 0.5 and tail_rms >= segmenter.silence_rms / 2:
+                    texts.append(transcribe_audio(tail))
+        except (ApiUnavailable,) + retryable_errors():
+            if spool is None:
+                raise
+            # Keep the whole dictation, not just the segment that failed: it is replayed in one piece
+            print("Could not reach OpenAI Whisper, keeping the recording for later.")
+            spool.add(segmenter.source.read(segmenter.start, segmenter.position), should_translate)
+            return None
+        if spool is not None:
+            spool.wake()
+
+        transcript_text = " ".join(text.strip() for text in texts if text.strip())
+        text = post_process(transcript_text, should_translate)
+        if history is not None:
+            # Only the tail was processed after release, the clip length isn't known here
+            history.add(transcript_text, text, "translate" if should_translate else "transcribe",
+                        None, time.perf_counter() - started)
+        return text
+    except Exception as e:
+        print(f"Error processing audio: {str(e)}")
+        return None
+
+class StatusChannel:
+    """Latest state for the status window, updated from any thread.
+
+    An update only overwrites fields under a lock, so any number of updates between two
+    redraws coalesce into one. The Tk main loop reads a snapshot on a timer, which keeps
+    the window's CPU cost bounded however often the status changes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = {"status": "Idle", "stage": "-", "latency": None}
+
+    def update(self, **fields):
+        with self.lock:
+            self.state.update(fields)
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.state)
+
+status = StatusChannel()
+
+def set_status(text):
+    """Show the recording status in the window, or print it when there is no window."""
+    status.update(status=text)
+    if root is None:
+        print(f"Status: {text}")
+
+def set_stage(text):
+    """Show what the pipeline is working on (only in the window, the console has its own output)."""
+    status.update(stage=text)
+
+class Earcons:
+    """Plays pre-rendered start and stop beeps on one output stream that stays open, mixing cues that overlap."""
+
+    def __init__(self, samplerate=44100, blocksize=256):
+        self.samplerate = samplerate
+        self.blocksize = blocksize
+        self.cues = {}
+        self.pending = queue.SimpleQueue()
+        self.playing = []
+        self.stream = None
+
+    def add(self, name, frequency, duration, volume=0.3):
+        """Render a sine tone cue, with a short fade at both ends so it doesn't click."""
+        t = np.arange(int(self.samplerate * duration)) / self.samplerate
+        tone = (np.sin(2 * np.pi * frequency * t) * volume).astype(np.float32)
+        fade = min(len(tone) // 2, int(self.samplerate * 0.005))
+        ramp = np.linspace(0, 1, fade, dtype=np.float32)
+        tone[:fade] *= ramp
+        tone[len(tone) - fade:] *= ramp[::-1]
+        self.cues[name] = tone
+
+    def start(self):
+        try:
+            self.stream = sd.OutputStream(
+                samplerate=self.samplerate,
+                blocksize=self.blocksize,
+                channels=1,
+                dtype="float32",
+                latency="low",
+                callback=self._callback,
+            )
+            self.stream.start()
+        except Exception as e:
+            print(f"No start/stop tones, could not open the audio output: {str(e)}")
+            self.stream = None
+
+    def play(self, name):
+        """Queue a cue; never blocks."""
+        if self.stream is not None:
+            self.pending.put([self.cues[name], 0])
+
+    def _callback(self, outdata, frames, time, status):
+        outdata.fill(0)
+        while not self.pending.empty():
+            self.playing.append(self.pending.get_nowait())
+        for cue in self.playing:
+            tone, position = cue
+            chunk = tone[position:position + frames]
+            outdata[:len(chunk), 0] += chunk
+            cue[1] = position + frames
+        self.playing = [cue for cue in self.playing if cue[1] < len(cue[0])]
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream.close()
+            self.stream = None
 
 def init_ui():
-    """Initialize the Tkinter UI if needed"""
-    global root, status_label
-    
+    """Create the status window (WHISPERER_UI=1). It runs on the main thread: main() calls
+    root.mainloop() instead of waiting on the listener."""
+    import tkinter as tk
+    global root
+
     try:
-        # Create Tkinter window
         root = tk.Tk()
         root.title("Whisperer")
-        root.geometry("300x100")
-        
-        # Create status label
-        status_label = tk.Label(root, text="Idle", font=("Arial", 14))
-        status_label.pack(pady=20)
-        
-        # Update UI in background thread
-        def update_ui():
-            try:
-                root.mainloop()
-            except Exception as e:
-                print(f"UI error: {str(e)}")
-                
-        ui_thread = threading.Thread(target=update_ui, daemon=True)
-        ui_thread.start()
+        root.geometry("320x140")
+
+        labels = {}
+        for name in ("status", "stage", "queue", "latency"):
+            labels[name] = tk.Label(root, text="", font=("Arial", 14 if name == "status" else 11))
+            labels[name].pack(anchor="w", padx=12, pady=2)
+
+        shown = {}
+        def refresh():
+            # Poll instead of pushing events: one cheap read per tick, however many updates came in
+            state = status.snapshot()
+            texts = {"status": state["status"], "stage": f"Stage: {state['stage']}"}
+            if scheduler is not None:
+                stats = scheduler.stats()
+                texts["queue"] = f"Queue: {stats['queued']} waiting, {stats['in_flight']} in progress"
+            latency = state["latency"]
+            texts["latency"] = "Last: -" if latency is None else f"Last: {latency:.2f}s from release to text"
+            for name, text in texts.items():
+                if shown.get(name) != text:
+                    labels[name].config(text=text)
+                    shown[name] = text
+            root.after(setting("UI_REFRESH_MS", 100), refresh)
+
+        refresh()
         return True
     except Exception as e:
         print(f"Could not initialize UI: {str(e)}")
         root = None
-        status_label = None
         return False
 
+def startup_step(name):
+    """Mark the end of a startup step for the startup profile."""
+    startup_steps.append((name, time.perf_counter()))
+
+def preload():
+    """Import the API client and the audio and clipboard helpers while the listener starts,
+    so the first recording doesn't pay for them."""
+    try:
+        import soundfile, pyperclip
+        get_client()
+        startup_step("preload (background)")
+    except Exception as e:
+        print(f"Preloading failed, will retry on first use: {str(e)}")
+
 def main():
+    global api_key
+    startup_step("imports")
     try:
         # Load environment variables
+        from dotenv import load_dotenv
         load_dotenv()
         
         # Initialize UI (optional)
-        # Comment out the next line if you don't want a UI window
-        # init_ui()
+        if setting("UI", False):
+            init_ui()
         
         # Helper function to get the correct resource path
         def resource_path(relative_path):
@@ -130,7 +1555,6 @@ def main():
         print("Hold right CTRL to record")
         print("Press right SHIFT while recording to translate to Dutch")
         print("Press CTRL+C to exit")
-        print("Waiting for input...")
 
         # Key to hold down to start recording
         record_key = Key.ctrl_r
@@ -148,7 +1572,59 @@ def main():
 
         # Read the API key from the file
         with open(api_key_path, 'r') as file:
-            openai.api_key = file.read().strip()
+            api_key = file.read().strip()
+        startup_step("settings and API key")
+
+        # Route clips between the local model and the API, based on measured latencies
+        global router, hedger, whisper_breaker, chat_breaker, spool, tracer, earcons, history
+        if setting("TRACE", False):
+            tracer = Tracer(setting("TRACE_PATH", "trace.jsonl"))
+        whisper_breaker = CircuitBreaker("Whisper", setting("BREAKER_THRESHOLD", 3), setting("BREAKER_RESET_SECONDS", 30.0))
+        chat_breaker = CircuitBreaker("Chat", setting("BREAKER_THRESHOLD", 3), setting("BREAKER_RESET_SECONDS", 30.0))
+        if setting("ROUTING", False) or setting("HEDGE_LOCAL", False) or setting("LOCAL_FALLBACK", False):
+            load_local_model()
+        if setting("ROUTING", False):
+            router = TranscriptionRouter(setting("ROUTING_LOG", "routing-log.jsonl"), setting("ROUTING_EXPLORE", 0.05))
+
+        # Keep recordings that fail while offline and replay them later
+        if setting("SPOOL", True):
+            spool = Spool(
+                setting("SPOOL_DIR", "spool"),
+                setting("SPOOL_MAX_MB", 200) * 1024 * 1024,
+                setting("SPOOL_MAX_FILES", 500),
+                setting("SPOOL_HISTORY", "spool-history.txt"),
+                setting("SPOOL_CLIPBOARD", True),
+            )
+            if spool.pending():
+                print(f"{len(spool.pending())} spooled recordings will be transcribed in the background.")
+
+        # Save every transcript to a searchable history
+        if setting("HISTORY", True):
+            history = History(setting("HISTORY_PATH", "history.sqlite3"), setting("HISTORY_FLUSH_SECONDS", 2.0))
+
+        # Hedge slow transcriptions with a backup request
+        if setting("HEDGE", False):
+            hedger = Hedger(
+                setting("HEDGE_MIN_DELAY_SECONDS", 1.0),
+                setting("HEDGE_DEFAULT_DELAY_SECONDS", 3.0),
+                # Every thread that can transcribe at the same time, plus the spool drainer
+                setting("WORKERS", 2) + setting("STREAM_WORKERS", 2) + 1,
+            )
+
+        # Start and stop tones, rendered once and played on an output stream that stays open
+        earcons = Earcons()
+        earcons.add("start", 800, 0.1)
+        earcons.add("stop", 400, 0.1)
+        earcons.start()
+
+        # Capturing in int16 halves the memory a recording needs
+        capture_dtype = np.int16 if setting("CAPTURE_INT16", False) else np.float32
+
+        # Optionally keep the microphone open for the whole session so recordings start instantly
+        global capture
+        if setting("PERSISTENT_STREAM", False):
+            capture = RingCapture(16000, setting("RING_SECONDS", 300), capture_dtype)
+            capture.start()
 
         # Callback function to collect audio data
         def callback(indata, frames, time, status):
@@ -156,15 +1632,51 @@ def main():
             if recording:
                 # Check if indata has the expected shape (e.g., (32,))
                 if indata.shape[1] == 1:  # Check if indata is mono
-                    audio_data.append(indata.copy())
+                    audio_data.append(indata)
                 else:
                     # Resize indata or discard it
                     pass
 
         keyboard = Controller()
+        injector = TextInjector(
+            keyboard,
+            setting("INJECT_MAX_TYPE_SECONDS", 1.0),
+            setting("INJECT_CHUNK_CHARS", 32),
+            setting("RESTORE_CLIPBOARD", True),
+        )
+
+        # Worker pool for recordings, with in-order delivery of the results
+        global scheduler
+        scheduler = JobScheduler(setting("WORKERS", 2), setting("MAX_QUEUE", 8))
+
+        def traced(job_id, work):
+            """Wrap work() so its spans belong to job_id, and record how long it waited for a worker."""
+            queued = time.perf_counter()
+            def run():
+                tracer.record("queue", job_id, queued)
+                with tracer.job(job_id):
+                    return work()
+            return run
+
+        def deliver(text, job_id=None, released=None, use_clipboard=False):
+            set_stage("Typing")
+            with tracer.span("inject", job_id, chars=len(text)):
+                inject_text(text, injector, use_clipboard)
+            set_stage("Done")
+            if released is not None:
+                # Key release to text in the window
+                tracer.record("total", job_id, released)
+                status.update(latency=time.perf_counter() - released)
+            stats = scheduler.stats()
+            print(f"Queue: {stats['queued']} waiting, {stats['in_flight']} in progress, "
+                  f"average wait {stats['avg_wait_ms']:.0f} ms (max {stats['max_wait_ms']:.0f} ms)")
+            if hedger is not None:
+                stats = hedger.stats()
+                print(f"Hedging: {stats['hedge_rate']:.0%} of {stats['requests']} requests hedged, "
+                      f"backup won {stats['hedge_wins']} times, {stats['saved_seconds']:.1f}s saved")
 
         def on_press(key):
-            global recording, stream, audio_data, translate
+            global recording, stream, audio_data, translate, capture_start, segmenter, segment_executor
 
             if key == record_key and not recording:
                 recording = True
@@ -172,105 +1684,47 @@ def main():
                 set_status("Recording...")
                 
                 # Play start recording tone (higher pitch)
-                play_tone(frequency=800, duration=0.1)
+                earcons.play("start")
 
-                audio_data = []
-              
-                # Initialize and start InputStream
-                stream = sd.InputStream(callback=callback, channels=1, samplerate=16000)
-                stream.start()
+                # Get a connection to the API ready while the user is speaking
+                warm_connection()
+
+                if capture is not None:
+                    # The stream is already running, just remember where this recording starts
+                    capture_start = capture.mark(setting("PREROLL_MS", 300))
+                else:
+                    audio_data = CaptureBuffer(capture_dtype)
+
+                    # Initialize and start InputStream
+                    stream = sd.InputStream(callback=callback, channels=1, samplerate=16000, dtype=np.dtype(capture_dtype).name)
+                    stream.start()
+
+                # In streaming mode, finished segments are sent off while the key is still held
+                if setting("STREAMING", False):
+                    if segment_executor is None:
+                        segment_executor = ThreadPoolExecutor(max_workers=setting("STREAM_WORKERS", 2))
+                    if capture is not None:
+                        segmenter = LiveSegmenter(capture, capture_start, segment_executor, tracer.new_job())
+                    else:
+                        segmenter = LiveSegmenter(audio_data, 0, segment_executor, tracer.new_job())
 
             # If recording and the translate key is pressed, set translate to True and throw away the keypress.
             if recording and key == translate_key:
                 print("Translate key pressed.")
                 translate = True
               
-        def process_audio(audio_data_copy, should_translate, keyboard_controller):
-            """Process audio in a background thread to avoid blocking new recordings."""
-            global force_clipboard
-            
-            try:
-                if audio_data_copy == []:
-                    print("No audio data recorded.")
-                    return
-              
-                # Concatenate all audio data into one NumPy array
-                audio_data_np = np.concatenate(audio_data_copy, axis=0)
-
-                # Get length of audio data in seconds
-                audio_data_length = len(audio_data_np) / 16000
-
-                if audio_data_length < 0.5:
-                    force_clipboard = True
-
-                if audio_data_length < 1:
-                    print("Audio data is less than 1 second long.")
-                    return
-
-                # Write audio data to file
-                soundfile.write('output.flac', audio_data_np, 16000, format='flac')
-              
-                # Save or send the audio data to OpenAI Whisper
-                with open("output.flac", "rb") as file:
-                    print("Sending audio data to OpenAI Whisper...")
-                    client = openai.OpenAI(api_key=openai.api_key)
-                    transcript = client.audio.transcriptions.create(
-                        model="whisper-1",
-                        file=file,
-                
-                    )
-                    transcript_text = transcript.text
-
-                    # Replace "New paragraph." with "\n"
-                    transcript_text = transcript_text.replace("New paragraph.", "\n\n")
-
-                    print("Transcript:")
-                    print(transcript_text)
-
-                    if should_translate:
-                        print("Translating transcript to Dutch...")
-                        result = openai.chat.completions.create(
-                            model="gpt-4o-mini",
-                            messages=[
-                                {"role": "system", "content": "You translate the input text to Dutch. You only output the translated text and nothing else. Avoid using the uw form as this is old fashioned"},
-                                {"role": "user", "content": transcript_text},
-                            ]
-                        )
-
-                        transcript_text = result.choices[0].message.content
-                        print(transcript_text)
-
-                    # Determine if any special characters are being used that can't be
-                    # typed using keyboard.type(). These are any characters that aren't in English
-                    allowed_chars = set('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 .,;:!?-\'_')
-                    special_chars = set(transcript_text) - allowed_chars
-                    if len(special_chars) > 0 or force_clipboard:
-                        print("Special characters detected: " + str(special_chars))
-
-                        # Copy the transcript text to the clipboard
-                        pyperclip.copy(transcript_text)
-
-                        # Simulate CTRL-V to paste the text
-                        keyboard_controller.press(Key.ctrl)
-                        keyboard_controller.press('v')
-                        keyboard_controller.release('v')
-                        keyboard_controller.release(Key.ctrl)
-                        force_clipboard = False
-                    else:  
-                        # Since there are no accents, we can just use the standard type command.
-                        keyboard_controller.type(transcript_text)
-            except Exception as e:
-                print(f"Error processing audio: {str(e)}")
-        
         def on_release(key):
-            global recording, stream, translate, force_clipboard
+            global recording, stream, translate, segmenter
 
             if key == record_key:
                 recording = False
+                # A streaming recording got its trace job on key press, for the segments sent while recording
+                job_id = segmenter.job_id if segmenter is not None else tracer.new_job()
+                released = time.perf_counter()
                 set_status("Idle")
                 
                 # Play stop recording tone (lower pitch)
-                play_tone(frequency=400, duration=0.1)
+                earcons.play("stop")
 
                 # Stop and close InputStream
                 if stream is not None:
@@ -278,24 +1732,63 @@ def main():
                     stream.close()
                     stream = None
 
+                if segmenter is not None:
+                    # Streaming mode: most of the clip is already being transcribed
+                    end = capture.frames_written if capture is not None else None
+                    active, should_translate = segmenter, translate
+                    use_clipboard = claim_clipboard(((end if end is not None else len(audio_data)) - active.start) / 16000)
+                    tracer.record("on_release", job_id, released)
+                    sequence = scheduler.submit(
+                        traced(job_id, lambda: finish_streaming(active, end, should_translate)),
+                        lambda text: deliver(text, job_id, released, use_clipboard),
+                    )
+                    if sequence is None:
+                        active.stop_event.set()
+                    segmenter = None
+                    translate = False
+                    return
+
                 # Create a copy of the audio data and translate flag for the background thread
-                audio_data_copy = audio_data.copy()
+                with tracer.span("concatenate", job_id) as span:
+                    if capture is not None:
+                        audio_data_copy = capture.read(capture_start)
+                    else:
+                        # No copy needed: the next recording gets a new buffer
+                        audio_data_copy = audio_data.read()
+                    span["clip_seconds"] = round(len(audio_data_copy) / 16000, 2)
                 should_translate = translate
+                use_clipboard = claim_clipboard(len(audio_data_copy) / 16000)
                 
                 # Reset translate flag immediately
                 translate = False
                 
-                # Process audio in background thread to allow immediate new recordings
-                processing_thread = threading.Thread(
-                    target=process_audio, 
-                    args=(audio_data_copy, should_translate, keyboard),
-                    daemon=True
+                # Process audio on the worker pool to allow immediate new recordings;
+                # the results are still typed in the order they were recorded
+                tracer.record("on_release", job_id, released)
+                scheduler.submit(
+                    traced(job_id, lambda: process_audio(audio_data_copy, should_translate)),
+                    lambda text: deliver(text, job_id, released, use_clipboard),
                 )
-                processing_thread.start()
               
+        startup_step("setup")
+
+        # The API client is imported on the side, the listener doesn't need it
+        threading.Thread(target=preload, name="whisperer-preload", daemon=True).start()
+
         # Start listening for key events
         with Listener(on_press=on_press, on_release=on_release) as listener:
-            listener.join()
+            startup_step("listener")
+            print(f"Waiting for input... (ready {time.perf_counter() - startup_time:.2f}s after startup)")
+            if setting("STARTUP_PROFILE", False):
+                previous = startup_time
+                for name, finished in list(startup_steps):
+                    print(f"  {name:<22} {(finished - previous) * 1000:>7.1f} ms")
+                    previous = finished
+            if root is not None:
+                # Tk has to run on the main thread; closing the window quits
+                root.mainloop()
+            else:
+                listener.join()
             
     except FileNotFoundError:
         print("\nError: Could not find openai_api_key.txt")
@@ -303,8 +1796,72 @@ def main():
     except Exception as e:
         print(f"\nAn error occurred: {str(e)}")
     finally:
+        if capture is not None:
+            capture.close()
+        if earcons is not None:
+            earcons.close()
+        if history is not None:
+            history.close()
         print("\nPress Enter to exit...")
         input()
 
+def trace_report(path):
+    """Print p50/p95/p99 latency per stage from a trace file written with WHISPERER_TRACE=1."""
+    durations = {}
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short when the app was closed
+                continue
+            durations.setdefault(record["stage"], []).append(record["ms"])
+
+    print(f"{'stage':<12} | {'count':>6} | {'p50':>9} | {'p95':>9} | {'p99':>9}")
+    print("-" * 58)
+    for stage, values in durations.items():
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        print(f"{stage:<12} | {len(values):>6} | {p50:>6.1f} ms | {p95:>6.1f} ms | {p99:>6.1f} ms")
+
+def search_history(path, query, limit=20):
+    """Newest history entries matching query, as (created, mode, clip_seconds, snippet) rows."""
+    sql = (
+        "SELECT history.created, history.mode, history.clip_seconds, snippet(history_fts, -1, '[', ']', '...', 16) "
+        "FROM history_fts JOIN history ON history.id = history_fts.rowid "
+        "WHERE history_fts MATCH ? ORDER BY history_fts.rowid DESC LIMIT ?"
+    )
+    db = open_history(path)
+    try:
+        try:
+            return db.execute(sql, (query, limit)).fetchall()
+        except sqlite3.OperationalError:
+            # Not valid FTS5 query syntax (an apostrophe, a stray quote): search the words as they are
+            words = " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+            return db.execute(sql, (words, limit)).fetchall()
+    finally:
+        db.close()
+
+def print_history_search(path, query, limit=20):
+    """Print the newest transcripts matching query, for python whisperer.py --search <words>."""
+    if not os.path.exists(path):
+        print(f"No history at {path} yet.")
+        return
+    start = time.perf_counter()
+    rows = search_history(path, query, limit)
+    elapsed = time.perf_counter() - start
+    for created, mode, clip_seconds, snippet in rows:
+        length = f"{clip_seconds:.0f}s" if clip_seconds is not None else "-"
+        print(f"[{time.strftime('%Y-%m-%d %H:%M', time.localtime(created))}] {mode:<10} {length:>4}  {' '.join(snippet.split())}")
+    print(f"{len(rows)} results in {elapsed * 1000:.1f} ms")
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1 and sys.argv[1] == "--trace-report":
+        trace_report(sys.argv[2] if len(sys.argv) > 2 else os.environ.get("WHISPERER_TRACE_PATH", "trace.jsonl"))
+    elif len(sys.argv) > 1 and sys.argv[1] == "--search":
+        if len(sys.argv) > 2:
+            print_history_search(setting("HISTORY_PATH", "history.sqlite3"), " ".join(sys.argv[2:]))
+        else:
+            print("Usage: python whisperer.py --search <words>")
+            sys.exit(2)
+    else:
+        main()